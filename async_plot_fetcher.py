@@ -0,0 +1,154 @@
+import time
+import random
+import asyncio
+from urllib.parse import urlparse
+import aiohttp
+from http_engine import BASE_URL, STATE_CODE, PLOT_INFO_PATH, PLOT_RATE, plot_info_response_to_text
+from plot_parser import parse_plot_info_text
+from scrape_logging import PLOT_INFO
+from concurrency_controller import report_plot_latency, report_plot_timeout
+from stage_metrics import record_stage, stage_span
+
+# Maximum number of plot info requests in flight per village
+DEFAULT_CONCURRENCY = 8
+
+# Sustained requests per second allowed against one host by this process, and the seconds of it a burst may use
+DEFAULT_RATE = PLOT_RATE
+BURST_SECONDS = 1.0
+
+# Retries per survey number and the base delay of the exponential backoff in seconds
+DEFAULT_RETRIES = 4
+DEFAULT_BACKOFF = 1.0
+
+# Token buckets by host, the event loop and the client session of this process, kept across villages
+host_buckets = {}
+event_loop = None
+client_session = None
+
+# Token bucket limiting the request rate against one host
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+# Function to get the token bucket of the host a URL points to, so the budget carries over from one village to the next
+def get_host_bucket(url, rate, burst_seconds=BURST_SECONDS):
+    host = urlparse(url).netloc
+    if host not in host_buckets:
+        host_buckets[host] = TokenBucket(rate, max(1.0, rate * burst_seconds))
+    return host_buckets[host]
+
+# Function to get the client session of this process, opening it on first use
+def get_client_session(concurrency, timeout):
+    global client_session
+    if client_session is None or client_session.closed:
+        client_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=concurrency),
+            timeout=aiohttp.ClientTimeout(total=timeout),
+            headers={"X-Requested-With": "XMLHttpRequest"}
+        )
+    return client_session
+
+# Function to fetch the plot info text of one survey number with rate limiting and jittered retries.
+# Only the request itself is reported as plot latency, the local rate limit wait is recorded as a stage of its own.
+async def fetch_plot_info_async(session, semaphore, bucket, village_code, survey_number, base_url, retries, backoff):
+    for attempt in range(retries):
+        async with semaphore:
+            wait_start_time = time.monotonic()
+            await bucket.acquire()
+            request_start_time = time.monotonic()
+            record_stage('rate_limit_wait', request_start_time - wait_start_time)
+            try:
+                async with session.post(base_url + PLOT_INFO_PATH, data={
+                    "state": STATE_CODE,
+                    "giscode": village_code,
+                    "plotno": survey_number,
+                }) as response:
+                    response.raise_for_status()
+                    plot_info_text = plot_info_response_to_text(await response.text())
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                if attempt == retries - 1:
+                    report_plot_timeout()
+                    record_stage('plotinfo_wait', time.monotonic() - request_start_time, failed=True)
+                    raise
+            else:
+                report_plot_latency(time.monotonic() - request_start_time)
+                record_stage('plotinfo_wait', time.monotonic() - request_start_time)
+                return plot_info_text
+        # Full jitter keeps workers that failed together from retrying together
+        await asyncio.sleep(random.uniform(0, backoff * 2 ** attempt))
+
+# Function to fetch (plot_index, survey_number, option_text) plots concurrently, appending records to plot_data in plot order.
+# Each plot is handed to plot_data as soon as the plots before it are, so only the out-of-order ones wait in memory.
+async def fetch_plots_async(village_code, plots, plot_data, log, base_url=BASE_URL, concurrency=DEFAULT_CONCURRENCY, rate=DEFAULT_RATE, retries=DEFAULT_RETRIES, backoff=DEFAULT_BACKOFF, timeout=30, on_plot=None, on_records=None):
+    semaphore = asyncio.Semaphore(concurrency)
+    bucket = get_host_bucket(base_url, rate)
+    session = get_client_session(concurrency, timeout)
+
+    # Records of finished plots by their position in plots, waiting for the plots before them
+    finished = {}
+    next_position = 0
+
+    def add_finished_plots():
+        nonlocal next_position
+        while next_position in finished:
+            plot_records = finished.pop(next_position)
+            next_position += 1
+            if plot_records:
+                log(f"Plot info: {plot_records[-1]}", PLOT_INFO)
+                plot_data.extend(plot_records)
+
+    async def fetch(plot_index, survey_number, plot_option_text):
+        try:
+            plot_info_text = await fetch_plot_info_async(session, semaphore, bucket, village_code, survey_number, base_url, retries, backoff)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            log(f"Error fetching plot info for option: {plot_option_text}: {e}")
+            return []
+        if on_plot is not None:
+            on_plot(plot_index, plot_option_text)
+        with stage_span('parse'):
+            plot_records = parse_plot_info_text(plot_info_text)
+        if on_records is not None:
+            on_records(plot_index, plot_option_text, plot_records)
+        return plot_records
+
+    async def fetch_and_add(position, plot_index, survey_number, plot_option_text):
+        finished[position] = await fetch(plot_index, survey_number, plot_option_text)
+        add_finished_plots()
+
+    await asyncio.gather(*[
+        fetch_and_add(position, plot_index, survey_number, plot_option_text)
+        for position, (plot_index, survey_number, plot_option_text) in enumerate(plots)
+    ])
+
+# Function to run the asyncio plot fetcher from synchronous code, on one event loop per process so the session and buckets live on
+def fetch_plots(village_code, plots, plot_data, log, **kwargs):
+    global event_loop
+    if event_loop is None:
+        event_loop = asyncio.new_event_loop()
+    event_loop.run_until_complete(fetch_plots_async(village_code, plots, plot_data, log, **kwargs))
+
+# Function to close the client session and event loop of this process once it has no more villages
+def close_plot_fetcher():
+    global event_loop, client_session
+    if event_loop is None:
+        return
+    if client_session is not None:
+        event_loop.run_until_complete(client_session.close())
+        client_session = None
+    event_loop.close()
+    event_loop = None
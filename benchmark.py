@@ -0,0 +1,325 @@
+import os
+import sys
+import json
+import time
+import queue
+import random
+import shutil
+import socket
+import platform
+import argparse
+import tempfile
+import statistics
+import threading
+import multiprocessing
+from datetime import datetime
+import pandas as pd
+from mock_site import MOCK_FIXTURE_FILE, load_mock_fixture, create_mock_site, get_mock_base_url
+from http_engine import PLOT_RATE, create_http_session
+from hierarchy_index import save_hierarchy_index, crawl_hierarchy_http, iter_talukas
+from crawl_state import DONE, open_crawl_db, enqueue_villages, count_jobs
+from scrape_logging import start_log_listener, stop_log_listener
+from stage_metrics import run_metrics_collector, build_metrics_snapshot
+from post_process import collect_village_tasks, process_village_tasks
+from scrap_firefox_parallel_villages import initialize_worker, scrape_village
+
+# Folder of the synthetic post-processing datasets and of the JSON results
+BENCHMARK_DATA_FOLDER = 'benchmark_data'
+BENCHMARK_RESULTS_FOLDER = 'benchmark_results'
+
+# Size of the synthetic district, close to a full district of the real crawl
+SYNTHETIC_TALUKAS = 14
+SYNTHETIC_VILLAGES_PER_TALUKA = 140
+SYNTHETIC_PLOTS_PER_VILLAGE = 400
+
+# Seconds between two samples of the memory of the processes a worker started
+CHILD_MEMORY_INTERVAL = 1.0
+
+# Metrics compared against a baseline run, and whether higher is better for each
+COMPARED_METRICS = {
+    'plots_per_second': True,
+    'villages_per_hour': True,
+    'latency_p50': False,
+    'latency_p95': False,
+    'latency_p99': False,
+    'peak_rss_mb': False,
+    'rows_per_second': True,
+}
+
+# Function to get the peak resident memory of the current process in megabytes
+def get_peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        # Windows has no resource module, psutil reports the peak working set instead
+        import psutil
+        return psutil.Process().memory_info().peak_wset / 1024 ** 2
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+# Function to sample the memory of the processes the current process started, such as geckodriver and Firefox, keeping the peak in megabytes.
+# The peak stays None without psutil.
+def sample_child_memory(peak, stop_event, interval=CHILD_MEMORY_INTERVAL):
+    try:
+        import psutil
+    except ImportError:
+        return
+    process = psutil.Process()
+    while not stop_event.wait(interval):
+        total = 0
+        for child in process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                # A browser quit between listing and sampling is simply not counted
+                pass
+        peak[0] = max(peak[0] or 0, total / 1024 ** 2)
+
+# Function to summarize per-plot latencies into percentiles in seconds
+def summarize_latencies(latencies):
+    if not latencies:
+        return {'latency_p50': None, 'latency_p95': None, 'latency_p99': None, 'latency_mean': None}
+    if len(latencies) == 1:
+        return {'latency_p50': latencies[0], 'latency_p95': latencies[0], 'latency_p99': latencies[0], 'latency_mean': latencies[0]}
+    percentiles = statistics.quantiles(latencies, n=100, method='inclusive')
+    return {
+        'latency_p50': percentiles[49],
+        'latency_p95': percentiles[94],
+        'latency_p99': percentiles[98],
+        'latency_mean': statistics.fmean(latencies),
+    }
+
+# Function to scrape villages in a pool worker and return its process id, its peak memory and the peak memory of the browsers it started
+def run_benchmark_worker(instance_id, db_path, index_file, engine, plot_concurrency, base_url, lean_browser, plot_rate):
+    child_peak = [None]
+    stop_event = threading.Event()
+    sampler = threading.Thread(target=sample_child_memory, args=(child_peak, stop_event), daemon=True)
+    sampler.start()
+    try:
+        scrape_village(instance_id, db_path, index_file, engine=engine, plot_concurrency=plot_concurrency, lean_browser=lean_browser, base_url=base_url, plot_rate=plot_rate)
+    finally:
+        stop_event.set()
+        sampler.join()
+    return os.getpid(), get_peak_rss_mb(), child_peak[0]
+
+# Function to collect the latency samples of the workers until stop_event is set
+def collect_samples(samples, latencies, counts, stop_event):
+    while not stop_event.is_set() or not samples.empty():
+        try:
+            kind, value = samples.get(timeout=0.5)
+        except queue.Empty:
+            continue
+        if kind == 'latency':
+            latencies.append(value)
+        else:
+            counts[kind] = counts.get(kind, 0) + 1
+
+# Function to run the scraper against the mock site with a number of workers and return its metrics
+def run_scraper_benchmark(fixture, engine, workers, villages, plot_concurrency=8, latency=0.0, jitter=0.0, lean_browser=False, plot_rate=PLOT_RATE):
+    server = create_mock_site(fixture, port=0, latency=latency, jitter=jitter)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = get_mock_base_url(server)
+
+    # Every run starts from an empty crawl database and output folder
+    run_folder = tempfile.mkdtemp(prefix=f'benchmark_{engine}_{workers}_')
+    db_path = os.path.join(run_folder, 'crawl_state.db')
+    index_file = os.path.join(run_folder, 'hierarchy_index.json')
+    hierarchy = save_hierarchy_index(crawl_hierarchy_http(create_http_session(), base_url), index_file)
+
+    conn = open_crawl_db(db_path)
+    queued = 0
+    for district, taluka in iter_talukas(hierarchy):
+        if queued >= villages:
+            break
+        taluka_villages = [(village["index"], village["name"]) for village in taluka["villages"][:villages - queued]]
+        enqueue_villages(conn, district["index"], taluka["index"], taluka_villages)
+        queued += len(taluka_villages)
+
+    log_listener, log_queue = start_log_listener(os.path.join(run_folder, 'scrape.jsonl'))
+    samples = multiprocessing.Queue()
+    latencies = []
+    counts = {}
+    stop_event = threading.Event()
+    collector = threading.Thread(target=collect_samples, args=(samples, latencies, counts, stop_event), daemon=True)
+    collector.start()
+
+    # Stage timings of the workers show where the time of a run goes
+    metrics_batches = multiprocessing.Queue()
+    stage_totals = {}
+    metrics_stop = threading.Event()
+    metrics_collector = threading.Thread(target=run_metrics_collector, args=(metrics_batches, stage_totals, threading.Lock(), metrics_stop, None), daemon=True)
+    metrics_collector.start()
+
+    # The workers write their village outputs inside the run folder
+    geckodriver_path = os.path.abspath('geckodriver.exe')
+    if os.path.exists(geckodriver_path):
+        shutil.copy(geckodriver_path, run_folder)
+    previous_directory = os.getcwd()
+    os.chdir(run_folder)
+    try:
+        start_time = time.perf_counter()
+        with multiprocessing.Pool(processes=workers, initializer=initialize_worker, initargs=(None, log_queue, samples, None, metrics_batches)) as pool:
+            worker_peaks = pool.starmap(run_benchmark_worker, [
+                (instance_id, db_path, index_file, engine, plot_concurrency, base_url, lean_browser, plot_rate / workers)
+                for instance_id in range(workers)
+            ], chunksize=1)
+        elapsed = time.perf_counter() - start_time
+    finally:
+        os.chdir(previous_directory)
+        stop_event.set()
+        collector.join()
+        metrics_stop.set()
+        metrics_collector.join()
+        stop_log_listener(log_listener)
+        server.shutdown()
+        server.server_close()
+
+    completed = count_jobs(conn).get(DONE, 0)
+    conn.close()
+    shutil.rmtree(run_folder, ignore_errors=True)
+
+    # A worker's memory includes the browsers it started, and a pool process that ran several workers keeps its highest peak
+    peaks = {}
+    browser_peaks = {}
+    for pid, peak, child_peak in worker_peaks:
+        peaks[pid] = max(peak + (child_peak or 0), peaks.get(pid, 0))
+        if child_peak is not None:
+            browser_peaks[pid] = max(child_peak, browser_peaks.get(pid, 0))
+
+    return {
+        'engine': engine,
+        'workers': workers,
+        'plot_rate': plot_rate,
+        'villages': completed,
+        'villages_queued': queued,
+        'plots': len(latencies),
+        'timeouts': counts.get('timeout', 0),
+        'crashes': counts.get('crash', 0),
+        'seconds': elapsed,
+        'plots_per_second': len(latencies) / elapsed,
+        'villages_per_hour': completed / elapsed * 3600,
+        **summarize_latencies(latencies),
+        'peak_rss_mb': max(peaks.values()),
+        'peak_rss_mb_per_worker': sorted(peaks.values()),
+        'peak_browser_rss_mb_per_worker': sorted(browser_peaks.values()),
+        'stages': build_metrics_snapshot(stage_totals)['stages'],
+    }
+
+# Function to write a synthetic district of village files and return its folder and row count
+def generate_synthetic_district(root=BENCHMARK_DATA_FOLDER, talukas=SYNTHETIC_TALUKAS, villages=SYNTHETIC_VILLAGES_PER_TALUKA, plots=SYNTHETIC_PLOTS_PER_VILLAGE, file_format='parquet', seed=0):
+    district_folder = os.path.join(root, f'synthetic_{talukas}x{villages}x{plots}_{file_format}')
+    rows = talukas * villages * plots
+    if os.path.exists(os.path.join(district_folder, '.complete')):
+        return district_folder, rows
+
+    rng = random.Random(seed)
+    first_names = ['राम', 'सीता', 'गणेश', 'लक्ष्मी', 'विठ्ठल', 'सुनील', 'अशोक', 'शारदा']
+    last_names = ['पाटील', 'जाधव', 'शिंदे', 'पवार', 'भोसले', 'मोरे', 'चव्हाण', 'देशमुख']
+    for taluka_number in range(1, talukas + 1):
+        taluka_folder = os.path.join(district_folder, f'{taluka_number:02d} तालुका{taluka_number}')
+        os.makedirs(taluka_folder, exist_ok=True)
+        for village_number in range(1, villages + 1):
+            village_df = pd.DataFrame({
+                'Survey No.': [str(plot) for plot in range(1, plots + 1)],
+                'Total Area': [round(rng.lognormvariate(0, 1.2), 4) for _ in range(plots)],
+                'Pot kharaba': [round(rng.random() * 0.1, 4) for _ in range(plots)],
+                'Owner Name': [f"{rng.choice(first_names)} {rng.choice(last_names)}" for _ in range(plots)],
+                'Khata No.': [str(rng.randint(1, 2000)) for _ in range(plots)],
+            })
+            village_path = os.path.join(taluka_folder, f'2799{taluka_number:02d}{village_number:06d}00 गाव{village_number}.{file_format}')
+            if file_format == 'parquet':
+                village_df.to_parquet(village_path, index=False)
+            else:
+                village_df.to_excel(village_path, index=False)
+    open(os.path.join(district_folder, '.complete'), 'w').close()
+    return district_folder, rows
+
+# Function to post-process a district folder with a number of workers and return its metrics
+def run_post_process_benchmark(district_folder, rows, workers, chunksize=16):
+    tasks = collect_village_tasks([district_folder])
+    start_time = time.perf_counter()
+    process_village_tasks(tasks, workers, chunksize)
+    elapsed = time.perf_counter() - start_time
+    return {
+        'workers': workers,
+        'villages': len(tasks),
+        'rows': rows,
+        'seconds': elapsed,
+        'rows_per_second': rows / elapsed,
+        'peak_rss_mb': get_peak_rss_mb(),
+    }
+
+# Function to print the relative change of every compared metric against a baseline result file
+def compare_results(baseline, results):
+    for section, key in (('scraper', ('engine', 'workers')), ('post_process', ('workers',))):
+        baseline_runs = {tuple(run[field] for field in key): run for run in baseline.get(section, [])}
+        for run in results.get(section, []):
+            baseline_run = baseline_runs.get(tuple(run[field] for field in key))
+            if baseline_run is None:
+                continue
+            changes = []
+            for metric, higher_is_better in COMPARED_METRICS.items():
+                if run.get(metric) is None or not baseline_run.get(metric):
+                    continue
+                change = run[metric] / baseline_run[metric] - 1
+                verdict = 'better' if (change > 0) == higher_is_better else 'worse'
+                changes.append(f"{metric} {change:+.1%} ({verdict})")
+            print(f"{section} {dict(zip(key, (run[field] for field in key)))}: {', '.join(changes)}")
+
+if __name__ == "__main__":
+    from multiprocessing import freeze_support
+    freeze_support()
+
+    parser = argparse.ArgumentParser(description="Benchmark the scraper engines against the mock site and the post-processor on a synthetic district")
+    parser.add_argument("--fixture", default=MOCK_FIXTURE_FILE, help="Fixture of the mock site, see mock_site.py")
+    parser.add_argument("--engines", nargs='+', choices=['selenium', 'http'], default=['http'], help="Engines to benchmark")
+    parser.add_argument("--workers", type=int, nargs='+', default=[1, 2, 4], help="Worker counts of the scraper runs")
+    parser.add_argument("--villages", type=int, default=20, help="Villages scraped per run")
+    parser.add_argument("--plot-concurrency", type=int, default=8, help="Survey numbers fetched at once by the http engine")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds the mock site adds to every call")
+    parser.add_argument("--jitter", type=float, default=0.05, help="Maximum random seconds added on top of the latency")
+    parser.add_argument("--plot-rate", type=float, default=PLOT_RATE, help="Plot info requests per second a run may send, split across its workers, raise it to measure the engines rather than the rate limit")
+    parser.add_argument("--lean-browser", action='store_true', help="Use the lean browser profile in selenium runs")
+    parser.add_argument("--post-workers", type=int, nargs='+', default=[1, 2, 4], help="Worker counts of the post-processing runs")
+    parser.add_argument("--synthetic-format", choices=['parquet', 'xlsx'], default='parquet', help="Format of the synthetic village files")
+    parser.add_argument("--skip-scraper", action='store_true', help="Only benchmark the post-processor")
+    parser.add_argument("--skip-post-process", action='store_true', help="Only benchmark the scraper")
+    parser.add_argument("--output", help="Result file, a timestamped file in benchmark_results by default")
+    parser.add_argument("--baseline", help="Earlier result file to compare against")
+    args = parser.parse_args()
+
+    results = {
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'host': socket.gethostname(),
+        'platform': platform.platform(),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'scraper': [],
+        'post_process': [],
+    }
+
+    if not args.skip_scraper:
+        fixture = load_mock_fixture(args.fixture)
+        for engine in args.engines:
+            for workers in args.workers:
+                run = run_scraper_benchmark(fixture, engine, workers, args.villages, args.plot_concurrency, args.latency, args.jitter, args.lean_browser, args.plot_rate)
+                print(f"{engine} x{workers}: {run['plots_per_second']:.1f} plots/s, {run['villages_per_hour']:.0f} villages/h, p95 {run['latency_p95']}s, peak RSS {run['peak_rss_mb']:.0f} MB")
+                results['scraper'].append(run)
+
+    if not args.skip_post_process:
+        district_folder, rows = generate_synthetic_district(file_format=args.synthetic_format)
+        for workers in args.post_workers:
+            run = run_post_process_benchmark(district_folder, rows, workers)
+            print(f"post-process x{workers}: {run['rows_per_second']:.0f} rows/s over {run['villages']} villages")
+            results['post_process'].append(run)
+
+    output_file = args.output or os.path.join(BENCHMARK_RESULTS_FOLDER, datetime.now().strftime('%Y%m%d_%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+    with open(output_file, 'w', encoding='utf-8') as file:
+        json.dump(results, file, indent=2)
+    print(f"Results written to {output_file}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            compare_results(json.load(file), results)
@@ -0,0 +1,172 @@
+import time
+import threading
+from page_readiness import forget_script_timeout, wait_for_element
+from scrape_logging import print_and_log_time
+
+# Warm browsers a worker keeps launched and on the start page besides the one it is using.
+# Every standby is one more Firefox process per worker, so sessions start cold unless this is raised.
+STANDBY_BROWSERS = 0
+
+# Seconds and megabytes of Firefox memory after which a browser is recycled
+MAX_BROWSER_AGE = 3600.0
+MAX_BROWSER_MEMORY_MB = 1500.0
+
+# Seconds the launcher waits after a failed launch, doubled after every further failure
+LAUNCH_RETRY_DELAY = 5.0
+MAX_LAUNCH_RETRY_DELAY = 120.0
+
+# Seconds a standby browser may take to load the start page
+START_PAGE_TIMEOUT = 120
+
+# Function to get the memory in megabytes of a browser and the processes it started, None without psutil
+def get_browser_memory_mb(driver):
+    try:
+        import psutil
+    except ImportError:
+        return None
+    try:
+        # The geckodriver process is the parent of the Firefox processes
+        geckodriver = psutil.Process(driver.service.process.pid)
+        processes = [geckodriver] + geckodriver.children(recursive=True)
+        return sum(process.memory_info().rss for process in processes) / 1024 ** 2
+    except (AttributeError, psutil.Error):
+        return None
+
+# Function to check that a browser still answers and is on a page with the dropdowns
+def is_browser_healthy(driver):
+    try:
+        return bool(driver.execute_script("return document.readyState === 'complete' && !!document.getElementById('level_0');"))
+    except Exception:
+        return False
+
+# Function to quit a browser, ignoring errors from an already crashed browser
+def quit_browser(driver, log_file=None):
+    forget_script_timeout(driver)
+    try:
+        driver.quit()
+    except Exception as e:
+        print_and_log_time(f"Error closing browser: {e}", log_file)
+
+# Standby browsers of one worker, launched and sent to the start page by a background thread
+class BrowserPool:
+    def __init__(self, launch, start_url, size=STANDBY_BROWSERS, max_age=MAX_BROWSER_AGE, max_memory_mb=MAX_BROWSER_MEMORY_MB, log_file=None):
+        self.launch = launch
+        self.start_url = start_url
+        self.size = size
+        self.max_age = max_age
+        self.max_memory_mb = max_memory_mb
+        self.log_file = log_file
+        self.standby = []
+        self.launch_times = {}
+        self.launching = False
+        self.paused = False
+        self.closed = False
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.run_launcher, daemon=True)
+        self.thread.start()
+
+    # Launch a browser and load the start page, quitting it if the page does not load
+    def launch_standby(self):
+        driver = self.launch()
+        try:
+            driver.get(self.start_url)
+            wait_for_element(driver, 'level_0', START_PAGE_TIMEOUT)
+        except Exception:
+            quit_browser(driver, self.log_file)
+            raise
+        return driver
+
+    # Keep the standby browsers topped up, retrying failed launches with a growing delay
+    def run_launcher(self):
+        retry_delay = LAUNCH_RETRY_DELAY
+        while True:
+            with self.condition:
+                while not self.closed and (self.paused or len(self.standby) >= self.size):
+                    self.condition.wait()
+                if self.closed:
+                    return
+                self.launching = True
+            try:
+                driver = self.launch_standby()
+            except Exception as e:
+                print_and_log_time(f"Error launching a standby browser, retrying in {retry_delay:.0f}s: {e}", self.log_file)
+                with self.condition:
+                    self.launching = False
+                    self.condition.notify_all()
+                    self.condition.wait(retry_delay)
+                retry_delay = min(retry_delay * 2, MAX_LAUNCH_RETRY_DELAY)
+                continue
+            retry_delay = LAUNCH_RETRY_DELAY
+            with self.condition:
+                self.launching = False
+                if self.closed or self.paused:
+                    quit_browser(driver, self.log_file)
+                else:
+                    self.launch_times[driver.session_id] = time.time()
+                    self.standby.append(driver)
+                self.condition.notify_all()
+
+    # Hand out a healthy standby browser on the start page, launching one in the calling thread if none is ready
+    def acquire(self, timeout=None):
+        deadline = time.time() + timeout if timeout is not None else None
+        with self.condition:
+            if self.paused:
+                self.paused = False
+                self.condition.notify_all()
+            while True:
+                while self.standby:
+                    driver = self.standby.pop(0)
+                    self.condition.notify_all()
+                    if is_browser_healthy(driver):
+                        return driver
+                    print_and_log_time("Discarding a standby browser that failed its health check", self.log_file)
+                    self.forget(driver)
+                    quit_browser(driver, self.log_file)
+                # Wait for a launch already under way rather than starting a second browser
+                if not self.launching or (deadline is not None and time.time() >= deadline):
+                    break
+                self.condition.wait(None if deadline is None else max(0, deadline - time.time()))
+
+        # No warm browser, fall back to a cold start like before
+        driver = self.launch_standby()
+        with self.condition:
+            self.launch_times[driver.session_id] = time.time()
+        return driver
+
+    # Check if a browser in use has reached the age or memory threshold
+    def needs_recycle(self, driver):
+        launched_at = self.launch_times.get(driver.session_id)
+        if launched_at is not None and time.time() - launched_at > self.max_age:
+            return f"older than {self.max_age:.0f}s"
+        memory = get_browser_memory_mb(driver)
+        if memory is not None and memory > self.max_memory_mb:
+            return f"using {memory:.0f} MB"
+        return None
+
+    # Drop the launch time of a browser that is being closed
+    def forget(self, driver):
+        self.launch_times.pop(driver.session_id, None)
+
+    # Close a browser handed out by the pool
+    def release(self, driver, log_file=None):
+        with self.condition:
+            self.forget(driver)
+        quit_browser(driver, log_file)
+
+    # Close the standby browsers and stop launching until the next acquire
+    def pause(self):
+        with self.condition:
+            self.paused = True
+            standby, self.standby = self.standby, []
+            for driver in standby:
+                self.forget(driver)
+        for driver in standby:
+            quit_browser(driver, self.log_file)
+
+    # Stop the launcher and close the standby browsers
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.pause()
+        self.thread.join()
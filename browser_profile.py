@@ -0,0 +1,52 @@
+from urllib.parse import quote
+from selenium.webdriver.firefox.options import Options
+
+# Path of the Firefox binary used by every scraper instance
+FIREFOX_BINARY = r"C:\Program Files\Mozilla Firefox\firefox.exe"  # Update this path if necessary
+
+# Requests for map tiles, images, fonts and stylesheets are sent to a closed local port and fail at once.
+# The dropdowns and #plotinfo are filled from the rest/ JSON endpoints, which stay direct.
+BLOCKED_REQUEST_PAC = """
+function FindProxyForURL(url, host) {
+    if (/\\/rest\\//.test(url)) {
+        return "DIRECT";
+    }
+    if (/[?&]request=getmap/i.test(url) || /\\/(wms|tiles?)\\b/i.test(url) ||
+        /\\.(png|jpe?g|gif|webp|svg|ico|woff2?|ttf|otf|eot|css)(\\?|#|$)/i.test(url)) {
+        return "PROXY 127.0.0.1:9";
+    }
+    return "DIRECT";
+}
+"""
+
+# Firefox preferences of the lean profile: no images, web fonts, caches on disk or speculative connections
+LEAN_PROFILE_PREFERENCES = {
+    "permissions.default.image": 2,
+    "gfx.downloadable_fonts.enabled": False,
+    "browser.display.use_document_fonts": 0,
+    "browser.cache.disk.enable": False,
+    "browser.cache.offline.enable": False,
+    "browser.cache.memory.capacity": 16384,
+    "browser.sessionhistory.max_entries": 2,
+    "browser.sessionhistory.max_total_viewers": 0,
+    "browser.sessionstore.resume_from_crash": False,
+    "network.prefetch-next": False,
+    "network.dns.disablePrefetch": True,
+    "network.http.speculative-parallel-limit": 0,
+    "media.autoplay.default": 5,
+    "webgl.disabled": True,
+    "layers.acceleration.disabled": True,
+    "network.proxy.type": 2,
+    "network.proxy.autoconfig_url": "data:application/x-ns-proxy-autoconfig," + quote(BLOCKED_REQUEST_PAC),
+    "network.proxy.autoconfig_url.include_path": True,
+}
+
+# Function to create the headless Firefox options, trimmed to what the scraper reads when lean is set
+def create_firefox_options(lean=False):
+    firefox_options = Options()
+    firefox_options.binary_location = FIREFOX_BINARY
+    firefox_options.add_argument('--headless')
+    if lean:
+        for name, value in LEAN_PROFILE_PREFERENCES.items():
+            firefox_options.set_preference(name, value)
+    return firefox_options
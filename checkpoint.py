@@ -0,0 +1,59 @@
+import os
+import json
+from plot_parser import PlotRecord
+
+# Folder inside each taluka folder holding the per-plot checkpoints of unfinished villages
+CHECKPOINT_FOLDER = '.checkpoints'
+
+# Function to get the checkpoint file of a village
+def get_checkpoint_path(taluka_path, village_name):
+    return os.path.join(taluka_path, CHECKPOINT_FOLDER, f'{village_name}.jsonl')
+
+# Function to load the plot options already scraped for a village and their records, into plot_data when one is given
+def load_plot_checkpoint(checkpoint_path, plot_data=None):
+    seen_options = set()
+    if plot_data is None:
+        plot_data = []
+    if not os.path.exists(checkpoint_path):
+        return seen_options, plot_data
+    with open(checkpoint_path, 'r', encoding='utf-8') as file:
+        for line in file:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A crash can leave the last line half written
+                continue
+            seen_options.add(entry['option'])
+            plot_data.extend(PlotRecord.from_dict(record) for record in entry['records'])
+    return seen_options, plot_data
+
+# Function to count the plots of the checkpoints in a taluka folder by village name, a lower bound of the size of each village
+def count_checkpoint_plots(taluka_path):
+    checkpoint_folder = os.path.join(taluka_path, CHECKPOINT_FOLDER)
+    if not os.path.isdir(checkpoint_folder):
+        return {}
+    plot_counts = {}
+    for file_name in os.listdir(checkpoint_folder):
+        if file_name.endswith('.jsonl'):
+            with open(os.path.join(checkpoint_folder, file_name), 'r', encoding='utf-8') as file:
+                plot_counts[os.path.splitext(file_name)[0]] = sum(1 for _ in file)
+    return plot_counts
+
+# Function to open a village checkpoint for appending
+def open_plot_checkpoint(checkpoint_path):
+    os.makedirs(os.path.dirname(checkpoint_path), exist_ok=True)
+    return open(checkpoint_path, 'a', encoding='utf-8')
+
+# Function to append the records of one scraped plot option to a village checkpoint
+def append_plot_checkpoint(checkpoint_file, plot_index, plot_option_text, plot_records):
+    checkpoint_file.write(json.dumps({
+        'plot_index': plot_index,
+        'option': plot_option_text,
+        'records': [record.to_dict() for record in plot_records]
+    }, ensure_ascii=False) + '\n')
+    checkpoint_file.flush()
+
+# Function to remove the checkpoint of a village once its output is saved
+def remove_plot_checkpoint(checkpoint_path):
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
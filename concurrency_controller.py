@@ -0,0 +1,127 @@
+import time
+import queue
+import statistics
+import threading
+import multiprocessing
+from event_queue import create_event_queue, send_event_nowait
+from scrape_logging import print_and_log_time
+
+# Seconds of samples the controller collects before each decision
+CONTROL_INTERVAL = 30.0
+
+# Median per-plot latency and share of timed out plots above which the server is treated as overloaded
+TARGET_PLOT_LATENCY = 5.0
+MAX_TIMEOUT_RATE = 0.05
+
+# Plots a window needs before its median latency is trusted
+MIN_LATENCY_SAMPLES = 10
+
+# Workers added after a healthy window and share of workers kept after an overloaded one
+ADDITIVE_INCREASE = 1
+MULTIPLICATIVE_DECREASE = 0.5
+
+# Maximum number of samples waiting for the controller
+CONTROL_QUEUE_SIZE = 100000
+
+# Seconds a paused worker sleeps before checking the limit again
+PAUSE_POLL_INTERVAL = 5.0
+
+# Log name the decisions are tagged with
+CONTROL_LOG_FILE = 'logs/concurrency.txt'
+
+# Sample queue and shared active worker limit, set in every process that reports samples
+control_queue = None
+active_limit = None
+
+# Function to set the sample queue and active worker limit of the current process, used as a pool initializer
+def set_concurrency_control(new_control_queue, new_active_limit):
+    global control_queue, active_limit
+    control_queue = new_control_queue
+    active_limit = new_active_limit
+
+# Function to send a sample to the controller of the current process
+def send_control_sample(sample):
+    send_event_nowait(control_queue, sample)
+
+# Function to report the seconds a plot took from selection to parsed info
+def report_plot_latency(seconds):
+    send_control_sample(('latency', seconds))
+
+# Function to report a plot whose info never arrived
+def report_plot_timeout():
+    send_control_sample(('timeout', None))
+
+# Function to report a browser session lost to an error
+def report_browser_crash():
+    send_control_sample(('crash', None))
+
+# Function to check if an instance is above the active worker limit
+def is_above_worker_limit(instance_id):
+    return active_limit is not None and instance_id >= active_limit.value
+
+# Function to block a worker while its instance is above the active limit, returns True if it had to wait
+def wait_for_worker_slot(instance_id, poll_interval=PAUSE_POLL_INTERVAL):
+    if not is_above_worker_limit(instance_id):
+        return False
+    while is_above_worker_limit(instance_id):
+        time.sleep(poll_interval)
+    return True
+
+# Function to pick the next worker limit from the samples of one window
+def decide_worker_limit(limit, latencies, timeouts, crashes, min_workers, max_workers):
+    plots = len(latencies) + timeouts
+    timeout_rate = timeouts / plots if plots else 0.0
+    median_latency = statistics.median(latencies) if len(latencies) >= MIN_LATENCY_SAMPLES else None
+
+    if crashes:
+        reason = f"{crashes} browser crashes"
+    elif timeout_rate > MAX_TIMEOUT_RATE:
+        reason = f"timeout rate {timeout_rate:.1%} above {MAX_TIMEOUT_RATE:.1%}"
+    elif median_latency is not None and median_latency > TARGET_PLOT_LATENCY:
+        reason = f"median plot latency {median_latency:.2f}s above {TARGET_PLOT_LATENCY:.2f}s"
+    else:
+        # No overload signal, probe one more worker
+        return min(max_workers, limit + ADDITIVE_INCREASE), "healthy"
+    return max(min_workers, int(limit * MULTIPLICATIVE_DECREASE)), reason
+
+# Function to collect samples and adjust the active worker limit until stop_event is set
+def run_concurrency_controller(samples, limit, min_workers, max_workers, stop_event, interval=CONTROL_INTERVAL, log_file=CONTROL_LOG_FILE):
+    while not stop_event.is_set():
+        latencies = []
+        timeouts = crashes = 0
+        deadline = time.time() + interval
+        while not stop_event.is_set() and time.time() < deadline:
+            try:
+                kind, value = samples.get(timeout=max(0.1, min(1.0, deadline - time.time())))
+            except queue.Empty:
+                continue
+            if kind == 'latency':
+                latencies.append(value)
+            elif kind == 'timeout':
+                timeouts += 1
+            elif kind == 'crash':
+                crashes += 1
+        if stop_event.is_set():
+            break
+
+        new_limit, reason = decide_worker_limit(limit.value, latencies, timeouts, crashes, min_workers, max_workers)
+        median_latency = f"{statistics.median(latencies):.2f}s" if latencies else "n/a"
+        print_and_log_time(
+            f"Concurrency {limit.value} -> {new_limit} ({reason}): {len(latencies)} plots, median latency {median_latency}, {timeouts} timeouts, {crashes} crashes",
+            log_file
+        )
+        limit.value = new_limit
+
+# Function to start the controller thread and return it with its stop event, sample queue and shared limit
+def start_concurrency_controller(initial_workers, min_workers, max_workers, interval=CONTROL_INTERVAL):
+    samples = create_event_queue(CONTROL_QUEUE_SIZE)
+    limit = multiprocessing.Value('i', max(min_workers, min(initial_workers, max_workers)))
+    stop_event = threading.Event()
+    thread = threading.Thread(target=run_concurrency_controller, args=(samples, limit, min_workers, max_workers, stop_event, interval), daemon=True)
+    thread.start()
+    return thread, stop_event, samples, limit
+
+# Function to stop the controller thread
+def stop_concurrency_controller(thread, stop_event):
+    stop_event.set()
+    thread.join()
@@ -0,0 +1,216 @@
+import os
+import json
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import pandas as pd
+import requests
+from crawl_state import (
+    CRAWL_DB_PATH, LEASE_SECONDS, HEARTBEATS_PER_LEASE, DONE, open_crawl_db, enqueue_villages, mark_villages_done, claim_village,
+    get_job, renew_lease, record_plot_count, complete_job, release_job, release_expired_leases, reset_failed_jobs, count_jobs
+)
+from hierarchy_index import HIERARCHY_INDEX_FILE, load_hierarchy_index, get_district, get_taluka_villages
+from parquet_store import PARQUET_ROOT, save_village_parquet, get_parquet_villages
+
+# Port the coordinator listens on
+COORDINATOR_PORT = 8765
+
+# Seconds between two sweeps of expired leases
+REAPER_INTERVAL = 60
+
+# Connections to the crawl database, one per server thread
+thread_state = threading.local()
+
+# Function to get the crawl database connection of the current server thread
+def get_thread_connection(db_path):
+    if getattr(thread_state, 'conn', None) is None:
+        thread_state.conn = open_crawl_db(db_path)
+    return thread_state.conn
+
+# Function to save uploaded village records the same way a local worker would
+def save_uploaded_village(records, district_name, taluka_name, village_name, output_format, parquet_root):
+    village_df = pd.DataFrame(records)
+    if output_format == 'parquet':
+        save_village_parquet(village_df, parquet_root, district_name, taluka_name, village_name)
+        return
+    taluka_path = os.path.join(district_name, taluka_name)
+    os.makedirs(taluka_path, exist_ok=True)
+    with pd.ExcelWriter(os.path.join(taluka_path, f"{village_name}.xlsx")) as writer:
+        village_df.to_excel(writer, sheet_name=village_name, index=False)
+
+# Request handler exposing the job queue as JSON over HTTP
+class CoordinatorHandler(BaseHTTPRequestHandler):
+    def send_json(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        conn = get_thread_connection(self.server.db_path)
+        if self.path == '/status':
+            self.send_json(200, count_jobs(conn))
+        elif self.path == '/hierarchy':
+            self.send_json(200, self.server.hierarchy)
+        else:
+            self.send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        conn = get_thread_connection(self.server.db_path)
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'{}')
+
+        if self.path == '/claim':
+            job = claim_village(conn, payload['worker'], payload.get('district_index'), payload.get('taluka_index'), lease_seconds=self.server.lease_seconds)
+            # Workers pace their heartbeats by the lease of this coordinator, whatever --lease-seconds it runs with
+            self.send_json(200, {'job': job, 'lease_seconds': self.server.lease_seconds})
+        elif self.path in ('/results', '/complete', '/release') and not renew_lease(conn, payload['job_id'], payload['worker'], self.server.lease_seconds):
+            # A worker whose lease expired must not overwrite the village another worker now owns
+            self.send_json(409, {'error': 'lease lost'})
+        elif self.path == '/heartbeat':
+            self.send_json(200, {'ok': renew_lease(conn, payload['job_id'], payload['worker'], self.server.lease_seconds)})
+        elif self.path == '/results':
+            # The output path comes from the leased job and the hierarchy, never from the worker
+            district_index, taluka_index, village_name = get_job(conn, payload['job_id'])
+            _, district_name, taluka_name = get_taluka_villages(self.server.hierarchy, district_index, taluka_index)
+            save_uploaded_village(payload['records'], district_name, taluka_name, village_name, self.server.output_format, self.server.parquet_root)
+            self.send_json(200, {'ok': True})
+        elif self.path == '/complete':
+            if payload.get('plot_count') is not None:
+                record_plot_count(conn, payload['job_id'], payload['plot_count'])
+            complete_job(conn, payload['job_id'], payload['worker'])
+            self.send_json(200, {'ok': True})
+        elif self.path == '/release':
+            if payload.get('plot_count') is not None:
+                record_plot_count(conn, payload['job_id'], payload['plot_count'])
+            release_job(conn, payload['job_id'], payload['worker'], payload.get('error'), progressed=payload.get('progressed', False))
+            self.send_json(200, {'ok': True})
+        else:
+            self.send_json(404, {'error': 'not found'})
+
+    def log_message(self, format, *args):
+        pass
+
+# Function to put the jobs of dead workers back in the queue at a fixed interval
+def run_lease_reaper(db_path, stop_event, interval=REAPER_INTERVAL):
+    conn = open_crawl_db(db_path)
+    while not stop_event.wait(interval):
+        release_expired_leases(conn)
+    conn.close()
+
+# Function to create the coordinator server
+def create_coordinator(db_path=CRAWL_DB_PATH, hierarchy=None, host='0.0.0.0', port=COORDINATOR_PORT, lease_seconds=LEASE_SECONDS, output_format='xlsx', parquet_root=PARQUET_ROOT):
+    server = ThreadingHTTPServer((host, port), CoordinatorHandler)
+    server.db_path = db_path
+    server.hierarchy = hierarchy
+    server.lease_seconds = lease_seconds
+    server.output_format = output_format
+    server.parquet_root = parquet_root
+    return server
+
+# Function to call the coordinator and return its JSON answer
+def coordinator_request(coordinator_url, path, payload, timeout=60):
+    response = requests.post(coordinator_url.rstrip('/') + path, json=payload, timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
+# Function to download the hierarchy index served by the coordinator
+def fetch_remote_hierarchy(coordinator_url, timeout=60):
+    response = requests.get(coordinator_url.rstrip('/') + '/hierarchy', timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
+# Function to read the job counts of the coordinator
+def fetch_remote_status(coordinator_url, timeout=60):
+    response = requests.get(coordinator_url.rstrip('/') + '/status', timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
+# Function to claim a village lease from the coordinator, optionally restricted to one taluka, returning the job and the seconds of its lease
+def claim_remote_village(coordinator_url, worker, district_index=None, taluka_index=None):
+    response = coordinator_request(coordinator_url, '/claim', {'worker': worker, 'district_index': district_index, 'taluka_index': taluka_index})
+    job = tuple(response['job']) if response['job'] is not None else None
+    return job, response.get('lease_seconds', LEASE_SECONDS)
+
+# Function to upload the records of a finished village to the coordinator
+def upload_village_results(coordinator_url, job_id, worker, village_df):
+    coordinator_request(coordinator_url, '/results', {
+        'job_id': job_id,
+        'worker': worker,
+        'records': json.loads(village_df.to_json(orient='records', force_ascii=False))
+    })
+
+# Function to mark a village as done on the coordinator
+def complete_remote_job(coordinator_url, job_id, worker, plot_count=None):
+    coordinator_request(coordinator_url, '/complete', {'job_id': job_id, 'worker': worker, 'plot_count': plot_count})
+
+# Function to give a village back to the coordinator
+def release_remote_job(coordinator_url, job_id, worker, error=None, plot_count=None, progressed=False):
+    coordinator_request(coordinator_url, '/release', {'job_id': job_id, 'worker': worker, 'error': error, 'plot_count': plot_count, 'progressed': progressed})
+
+# Function to renew a village lease in a background thread until the returned event is set, several times per lease
+def start_heartbeat(coordinator_url, job_id, worker, lease_seconds=LEASE_SECONDS):
+    interval = lease_seconds / HEARTBEATS_PER_LEASE
+    stop_event = threading.Event()
+
+    def beat():
+        while not stop_event.wait(interval):
+            try:
+                coordinator_request(coordinator_url, '/heartbeat', {'job_id': job_id, 'worker': worker})
+            except requests.RequestException:
+                # A missed heartbeat is retried on the next interval, the lease covers several of them
+                pass
+
+    threading.Thread(target=beat, daemon=True).start()
+    return stop_event
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the crawl job queue to scraper workers on other nodes")
+    parser.add_argument("--districts", type=int, nargs='+', default=[], help="Dropdown indices of the districts to queue")
+    parser.add_argument("--talukas", type=int, nargs='+', help="Dropdown indices of the talukas to queue, all talukas of the districts by default")
+    parser.add_argument("--host", default='0.0.0.0', help="Address to listen on")
+    parser.add_argument("--port", type=int, default=COORDINATOR_PORT, help="Port to listen on")
+    parser.add_argument("--lease-seconds", type=int, default=LEASE_SECONDS, help="Seconds a village lease lasts without a heartbeat")
+    parser.add_argument("--output-format", choices=['xlsx', 'parquet'], default='xlsx', help="Format uploaded villages are saved in")
+    parser.add_argument("--db", default=CRAWL_DB_PATH, help="Path of the crawl state database")
+    parser.add_argument("--hierarchy-index", default=HIERARCHY_INDEX_FILE, help="Path of the hierarchy index")
+    args = parser.parse_args()
+
+    hierarchy = load_hierarchy_index(args.hierarchy_index, ttl_seconds=None)
+    if hierarchy is None:
+        raise SystemExit(f"Hierarchy index '{args.hierarchy_index}' not found, run the scraper once to discover it")
+
+    # Queue the villages of the selected talukas, marking the ones already saved here as done
+    conn = open_crawl_db(args.db)
+
+    # Villages failed by an earlier run, e.g. during a site outage, get a fresh set of attempts
+    reset_jobs = reset_failed_jobs(conn)
+    if reset_jobs:
+        print(f"Requeued {reset_jobs} villages failed by an earlier run")
+    for district_index in args.districts:
+        for taluka in get_district(hierarchy, district_index)["talukas"]:
+            if args.talukas and taluka["index"] not in args.talukas:
+                continue
+            villages, district_name, taluka_name = get_taluka_villages(hierarchy, district_index, taluka["index"])
+            taluka_path = os.path.join(district_name, taluka_name)
+            enqueue_villages(conn, district_index, taluka["index"], villages)
+            saved_villages = get_parquet_villages(PARQUET_ROOT, district_name, taluka_name)
+            if os.path.exists(taluka_path):
+                saved_villages += [os.path.splitext(file)[0] for file in os.listdir(taluka_path) if file.endswith('.xlsx')]
+            mark_villages_done(conn, district_index, taluka["index"], saved_villages)
+    job_counts = count_jobs(conn)
+    conn.close()
+    print(f"Serving {sum(job_counts.values())} villages ({job_counts.get(DONE, 0)} done) on {args.host}:{args.port}")
+
+    stop_event = threading.Event()
+    threading.Thread(target=run_lease_reaper, args=(args.db, stop_event), daemon=True).start()
+    server = create_coordinator(args.db, hierarchy, args.host, args.port, args.lease_seconds, args.output_format)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+        server.server_close()
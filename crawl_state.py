@@ -0,0 +1,221 @@
+import time
+import sqlite3
+import threading
+
+# Path of the SQLite database holding the crawl jobs
+CRAWL_DB_PATH = "crawl_state.db"
+
+# Seconds a worker owns a claimed job without a heartbeat before it is handed to another worker
+LEASE_SECONDS = 600
+
+# Heartbeats a worker sends per lease, so several can be missed before the lease lapses
+HEARTBEATS_PER_LEASE = 6
+HEARTBEAT_INTERVAL = LEASE_SECONDS / HEARTBEATS_PER_LEASE
+
+# Number of claims without plot progress after which a job is marked as failed until the next run
+MAX_ATTEMPTS = 3
+
+# Job states
+PENDING = 'pending'
+IN_FLIGHT = 'in_flight'
+DONE = 'done'
+FAILED = 'failed'
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY,
+        district_index INTEGER NOT NULL,
+        taluka_index INTEGER NOT NULL,
+        village_index INTEGER NOT NULL,
+        village_name TEXT NOT NULL,
+        survey_number TEXT NOT NULL DEFAULT '',
+        state TEXT NOT NULL DEFAULT 'pending',
+        priority INTEGER NOT NULL DEFAULT 0,
+        worker TEXT,
+        lease_expires REAL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        error TEXT,
+        plot_count INTEGER,
+        updated_at REAL,
+        UNIQUE (district_index, taluka_index, village_index, survey_number)
+    );
+    CREATE INDEX IF NOT EXISTS jobs_by_state ON jobs (state, priority DESC, id);
+    CREATE INDEX IF NOT EXISTS jobs_by_lease ON jobs (state, lease_expires);
+"""
+
+# Function to open the crawl database in WAL mode so several processes can share it
+def open_crawl_db(db_path=CRAWL_DB_PATH):
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=30000")
+    conn.executescript(SCHEMA)
+
+    # Databases created before plot counts were recorded get the column added
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(jobs)")]
+    if 'plot_count' not in columns:
+        conn.execute("ALTER TABLE jobs ADD COLUMN plot_count INTEGER")
+    return conn
+
+# Function to add the villages of a taluka as pending jobs, keeping the state of known ones
+def enqueue_villages(conn, district_index, taluka_index, villages, priority=0):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.executemany(
+            "INSERT OR IGNORE INTO jobs (district_index, taluka_index, village_index, village_name, priority, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+            [(district_index, taluka_index, village_index, village_name, priority, time.time()) for village_index, village_name in villages]
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+# Function to mark villages that already have an output file as done
+def mark_villages_done(conn, district_index, taluka_index, village_names):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.executemany(
+            "UPDATE jobs SET state = ?, updated_at = ? WHERE district_index = ? AND taluka_index = ? AND village_name = ? AND survey_number = ''",
+            [(DONE, time.time(), district_index, taluka_index, village_name) for village_name in village_names]
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+# Function to schedule villages that were never counted by the plots known of them, such as the plots in their checkpoints
+def seed_priorities(conn, district_index, taluka_index, plot_counts):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.executemany(
+            "UPDATE jobs SET priority = ?, updated_at = ? WHERE district_index = ? AND taluka_index = ? AND village_name = ? AND survey_number = '' AND state = ? AND plot_count IS NULL",
+            [(plot_count, time.time(), district_index, taluka_index, village_name, PENDING) for village_name, plot_count in plot_counts.items()]
+        )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+# Function to put jobs whose lease has expired back in the queue
+def release_expired_leases(conn, now=None):
+    now = time.time() if now is None else now
+    conn.execute(
+        "UPDATE jobs SET state = CASE WHEN attempts >= ? THEN ? ELSE ? END, worker = NULL, lease_expires = NULL, updated_at = ? WHERE state = ? AND lease_expires < ?",
+        (MAX_ATTEMPTS, FAILED, PENDING, now, IN_FLIGHT, now)
+    )
+
+# Function to put every in-flight job back in the queue, for a run that owns the database and starts with no live workers.
+# The claim interrupted by the crash is not counted as an attempt.
+def reset_in_flight_jobs(conn):
+    cursor = conn.execute(
+        "UPDATE jobs SET state = ?, worker = NULL, lease_expires = NULL, attempts = MAX(attempts - 1, 0), updated_at = ? WHERE state = ?",
+        (PENDING, time.time(), IN_FLIGHT)
+    )
+    return cursor.rowcount
+
+# Function to give the failed jobs a fresh set of attempts, for a run starting over the queue.
+# Their checkpoints are kept, so a village failed by an outage resumes where it stopped.
+def reset_failed_jobs(conn):
+    cursor = conn.execute(
+        "UPDATE jobs SET state = ?, attempts = 0, updated_at = ? WHERE state = ?",
+        (PENDING, time.time(), FAILED)
+    )
+    return cursor.rowcount
+
+# Function to atomically claim the next pending village, optionally restricted to one taluka
+def claim_village(conn, worker, district_index=None, taluka_index=None, lease_seconds=LEASE_SECONDS):
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        release_expired_leases(conn, now)
+        query = "SELECT id, district_index, taluka_index, village_index, village_name FROM jobs WHERE state = ? AND survey_number = ''"
+        params = [PENDING]
+        if district_index is not None:
+            query += " AND district_index = ?"
+            params.append(district_index)
+        if taluka_index is not None:
+            query += " AND taluka_index = ?"
+            params.append(taluka_index)
+        row = conn.execute(query + " ORDER BY priority DESC, id LIMIT 1", params).fetchone()
+        if row is not None:
+            conn.execute(
+                "UPDATE jobs SET state = ?, worker = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ? WHERE id = ?",
+                (IN_FLIGHT, worker, now + lease_seconds, now, row[0])
+            )
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    return row
+
+# Function to get the district index, taluka index and village name of a job, None if there is no such job
+def get_job(conn, job_id):
+    return conn.execute("SELECT district_index, taluka_index, village_name FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+# Function to extend the lease of a job that is still being worked on
+def renew_lease(conn, job_id, worker, lease_seconds=LEASE_SECONDS):
+    now = time.time()
+    cursor = conn.execute(
+        "UPDATE jobs SET lease_expires = ?, updated_at = ? WHERE id = ? AND worker = ? AND state = ?",
+        (now + lease_seconds, now, job_id, worker, IN_FLIGHT)
+    )
+    return cursor.rowcount == 1
+
+# Function to renew the lease of a job in a background thread until the returned event is set or the lease is lost
+def start_lease_heartbeat(db_path, job_id, worker, lease_seconds=LEASE_SECONDS, interval=HEARTBEAT_INTERVAL):
+    stop_event = threading.Event()
+
+    def beat():
+        # SQLite connections stay in the thread that opened them
+        conn = open_crawl_db(db_path)
+        try:
+            while not stop_event.wait(interval):
+                try:
+                    if not renew_lease(conn, job_id, worker, lease_seconds):
+                        break
+                except sqlite3.OperationalError:
+                    # A locked database is retried on the next interval, the lease covers several of them
+                    pass
+        finally:
+            conn.close()
+
+    threading.Thread(target=beat, daemon=True).start()
+    return stop_event
+
+# Function to record the number of plots of a village, which schedules its reruns largest first
+def record_plot_count(conn, job_id, plot_count):
+    conn.execute(
+        "UPDATE jobs SET plot_count = ?, priority = ?, updated_at = ? WHERE id = ?",
+        (plot_count, plot_count, time.time(), job_id)
+    )
+
+# Function to mark a claimed job as done, returns False if the worker no longer holds its lease
+def complete_job(conn, job_id, worker):
+    cursor = conn.execute(
+        "UPDATE jobs SET state = ?, worker = NULL, lease_expires = NULL, error = NULL, updated_at = ? WHERE id = ? AND worker = ? AND state = ?",
+        (DONE, time.time(), job_id, worker, IN_FLIGHT)
+    )
+    return cursor.rowcount == 1
+
+# Function to give a claimed job back, failing it until the next run once it has used up its attempts.
+# A claim that scraped new plots is not counted as an attempt, so a large village is never failed while it progresses.
+# It returns False if the worker no longer holds the lease, leaving the job to its new owner.
+def release_job(conn, job_id, worker, error=None, retry=True, progressed=False):
+    refund = int(bool(progressed))
+    cursor = conn.execute(
+        "UPDATE jobs SET state = CASE WHEN ? AND attempts - ? < ? THEN ? ELSE ? END, attempts = attempts - ?, worker = NULL, lease_expires = NULL, error = ?, updated_at = ? WHERE id = ? AND worker = ? AND state = ?",
+        (retry, refund, MAX_ATTEMPTS, PENDING, FAILED, refund, error, time.time(), job_id, worker, IN_FLIGHT)
+    )
+    return cursor.rowcount == 1
+
+# Function to count the jobs of each state, optionally restricted to one taluka
+def count_jobs(conn, district_index=None, taluka_index=None):
+    query = "SELECT state, COUNT(*) FROM jobs WHERE survey_number = ''"
+    params = []
+    if district_index is not None:
+        query += " AND district_index = ?"
+        params.append(district_index)
+    if taluka_index is not None:
+        query += " AND taluka_index = ?"
+        params.append(taluka_index)
+    return dict(conn.execute(query + " GROUP BY state", params).fetchall())
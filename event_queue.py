@@ -0,0 +1,15 @@
+import queue
+import multiprocessing
+
+# Function to create the bounded queue a background consumer reads events from, events beyond size are dropped
+def create_event_queue(size):
+    return multiprocessing.Queue(size)
+
+# Function to send an event to a queue without ever blocking the scraper, dropping it when the queue is unset or full
+def send_event_nowait(event_queue, event):
+    if event_queue is None:
+        return
+    try:
+        event_queue.put_nowait(event)
+    except queue.Full:
+        pass
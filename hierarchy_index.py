@@ -0,0 +1,100 @@
+import os
+import json
+import time
+
+# Index file of the state -> district -> taluka -> village tree
+HIERARCHY_INDEX_FILE = "hierarchy_index.json"
+
+# Seconds after which the index is crawled again
+HIERARCHY_TTL_SECONDS = 7 * 24 * 3600
+
+# Function to build a node of the index; index is the dropdown index the scraper selects it by
+def make_node(index, code, name, children_key=None, children=None):
+    node = {"index": index, "code": code, "name": name}
+    if children_key is not None:
+        node[children_key] = children or []
+    return node
+
+# Function to load the index, returning None if it is missing or older than the TTL
+def load_hierarchy_index(index_file=HIERARCHY_INDEX_FILE, ttl_seconds=HIERARCHY_TTL_SECONDS):
+    if not os.path.exists(index_file):
+        return None
+    with open(index_file, 'r', encoding='utf-8') as file:
+        hierarchy = json.load(file)
+    if ttl_seconds is not None and time.time() - hierarchy.get("crawled_at", 0) > ttl_seconds:
+        return None
+    return hierarchy
+
+# Function to save the index with the time it was crawled
+def save_hierarchy_index(districts, index_file=HIERARCHY_INDEX_FILE):
+    hierarchy = {"crawled_at": time.time(), "districts": districts}
+    temp_file = index_file + '.tmp'
+    with open(temp_file, 'w', encoding='utf-8') as file:
+        json.dump(hierarchy, file, ensure_ascii=False, indent=1)
+    os.replace(temp_file, index_file)
+    return hierarchy
+
+# Function to find a district of the index by its dropdown index
+def get_district(hierarchy, district_index):
+    for district in hierarchy["districts"]:
+        if district["index"] == district_index:
+            return district
+    raise KeyError(f"District {district_index} not in the hierarchy index")
+
+# Function to find a taluka of the index by the dropdown indices of its district and itself
+def get_taluka(hierarchy, district_index, taluka_index):
+    for taluka in get_district(hierarchy, district_index)["talukas"]:
+        if taluka["index"] == taluka_index:
+            return taluka
+    raise KeyError(f"Taluka {taluka_index} of district {district_index} not in the hierarchy index")
+
+# Function to get the (index, name) villages of a taluka with the district and taluka names
+def get_taluka_villages(hierarchy, district_index, taluka_index):
+    district = get_district(hierarchy, district_index)
+    taluka = get_taluka(hierarchy, district_index, taluka_index)
+    village_options = [(village["index"], village["name"]) for village in taluka["villages"]]
+    return village_options, district["name"], taluka["name"]
+
+# Function to get the code of a village of the index by its name, None if the taluka has no such village.
+# Jobs queued before a re-crawl keep their old dropdown index, so the index is never trusted to find the village.
+def get_village_code(hierarchy, district_index, taluka_index, village_name):
+    for village in get_taluka(hierarchy, district_index, taluka_index)["villages"]:
+        if village["name"] == village_name:
+            return village.get("code")
+    return None
+
+# Function to list every (district index, taluka index) pair of the index
+def iter_talukas(hierarchy):
+    for district in hierarchy["districts"]:
+        for taluka in district["talukas"]:
+            yield district, taluka
+
+# Function to find the villages of a taluka by the district and taluka names used for the output folders
+def find_taluka_villages_by_name(hierarchy, district_name, taluka_name):
+    for district, taluka in iter_talukas(hierarchy):
+        if taluka["name"] == taluka_name and (district_name is None or district["name"] == district_name):
+            return [village["name"] for village in taluka["villages"]]
+    return None
+
+# Function to crawl the tree over the HTTP engine instead of a browser
+def crawl_hierarchy_http(session, base_url=None):
+    from http_engine import BASE_URL, fetch_level_options
+    base_url = base_url or BASE_URL
+
+    # The state and category dropdowns are selected by their first option
+    state_code, _ = fetch_level_options(session, 0, [], base_url)[0]
+    category_code, _ = fetch_level_options(session, 1, [state_code], base_url)[0]
+    parent_codes = [state_code, category_code]
+
+    # Browser indices of the lower levels are shifted by the placeholder option
+    districts = []
+    for district_index, (district_code, district_name) in enumerate(fetch_level_options(session, 2, parent_codes, base_url), start=1):
+        talukas = []
+        for taluka_index, (taluka_code, taluka_name) in enumerate(fetch_level_options(session, 3, parent_codes + [district_code], base_url), start=1):
+            villages = [
+                make_node(village_index, village_code, village_name)
+                for village_index, (village_code, village_name) in enumerate(fetch_level_options(session, 4, parent_codes + [district_code, taluka_code], base_url), start=1)
+            ]
+            talukas.append(make_node(taluka_index, taluka_code, taluka_name, "villages", villages))
+        districts.append(make_node(district_index, district_code, district_name, "talukas", talukas))
+    return districts
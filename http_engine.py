@@ -0,0 +1,161 @@
+import re
+import time
+import html
+import json
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from plot_parser import parse_plot_info_text
+from scrape_logging import PLOT_INFO
+from concurrency_controller import report_plot_latency, report_plot_timeout
+from stage_metrics import stage_span
+
+# Base URL of the site and the state code used by its REST endpoints
+BASE_URL = "https://mahabhunakasha.mahabhumi.gov.in/27/"
+STATE_CODE = "27"
+
+# Endpoints called by index.html to fill the level dropdowns, the plot dropdown and the #plotinfo panel
+LEVEL_OPTIONS_PATH = "rest/VillageMapService/ListsAfterBoth"
+PLOT_OPTIONS_PATH = "rest/VillageMapService/kidelistFromGisCodeMH"
+PLOT_INFO_PATH = "rest/MapInfo/getPlotInfo"
+
+# Number of pooled connections kept open to the site
+HTTP_POOL_SIZE = 10
+
+# Sustained plot info requests per second the concurrent fetcher allows against the site, shared by all workers
+PLOT_RATE = 5.0
+
+# Function to create a pooled HTTP session with retries on transient server errors
+def create_http_session(pool_size=HTTP_POOL_SIZE, retries=3):
+    session = requests.Session()
+    retry = Retry(total=retries, backoff_factor=1, status_forcelist=(500, 502, 503, 504))
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"X-Requested-With": "XMLHttpRequest"})
+    return session
+
+# Function to turn an options payload into a list of (code, name) pairs
+def parse_options(payload):
+    if isinstance(payload, dict):
+        payload = payload.get("options", payload.get("data", []))
+    options = []
+    for item in payload:
+        if isinstance(item, dict):
+            options.append((str(item.get("code", item.get("value"))), item.get("value", item.get("name"))))
+        else:
+            options.append((str(item), str(item)))
+    return options
+
+# Function to fetch the options of a level dropdown given the codes selected above it
+def fetch_level_options(session, level, parent_codes, base_url=BASE_URL, timeout=30):
+    response = session.post(base_url + LEVEL_OPTIONS_PATH, data={
+        "state": STATE_CODE,
+        "level": level,
+        "codes": ",".join(parent_codes) + ("," if parent_codes else ""),
+    }, timeout=timeout)
+    response.raise_for_status()
+    return parse_options(response.json())
+
+# Function to fetch the survey numbers of a village
+def fetch_plot_options(session, village_code, base_url=BASE_URL, timeout=30):
+    response = session.post(base_url + PLOT_OPTIONS_PATH, data={
+        "state": STATE_CODE,
+        "giscode": village_code,
+    }, timeout=timeout)
+    response.raise_for_status()
+    return parse_options(response.json())
+
+# Function to convert the html of the plot info panel into the text Selenium reads from #plotinfo
+def plot_info_html_to_text(plot_info_html):
+    text = re.sub(r'(?i)<br\s*/?>|</(p|div|tr|li|h\d)>', '\n', plot_info_html)
+    text = re.sub(r'(?i)</t[dh]>', ' ', text)
+    text = html.unescape(re.sub(r'<[^>]+>', '', text))
+    lines = [re.sub(r'[ \t]+', ' ', line).strip() for line in text.split('\n')]
+    return '\n'.join(line for line in lines if line)
+
+# Function to convert a plot info response body, json or html, into the panel text
+def plot_info_response_to_text(body):
+    try:
+        payload = json.loads(body)
+    except json.JSONDecodeError:
+        return plot_info_html_to_text(body)
+    if isinstance(payload, dict):
+        payload = payload.get("info", payload.get("html", ""))
+    return plot_info_html_to_text(payload)
+
+# Function to fetch the text of the plot info panel for one survey number
+def fetch_plot_info(session, village_code, survey_number, base_url=BASE_URL, timeout=30):
+    response = session.post(base_url + PLOT_INFO_PATH, data={
+        "state": STATE_CODE,
+        "giscode": village_code,
+        "plotno": survey_number,
+    }, timeout=timeout)
+    response.raise_for_status()
+    return plot_info_response_to_text(response.text)
+
+# Function to resolve the district, taluka and village codes the same way the browser selects them
+def resolve_village(session, district_index, taluka_index, village_name, base_url=BASE_URL):
+    # The state and category dropdowns are selected by their first option
+    state_code, _ = fetch_level_options(session, 0, [], base_url)[0]
+    category_code, _ = fetch_level_options(session, 1, [state_code], base_url)[0]
+
+    # The district and taluka dropdowns have a placeholder at index 0 in the browser
+    district_code, district_name = fetch_level_options(session, 2, [state_code, category_code], base_url)[district_index - 1]
+    taluka_code, taluka_name = fetch_level_options(session, 3, [state_code, category_code, district_code], base_url)[taluka_index - 1]
+
+    for village_code, name in fetch_level_options(session, 4, [state_code, category_code, district_code, taluka_code], base_url):
+        if name == village_name:
+            return district_name, taluka_name, village_code
+    return district_name, taluka_name, None
+
+# Function to scrape every plot of a village over HTTP into plot_data
+def scrape_village_http(session, district_index, taluka_index, village_name, plot_data, log, base_url=BASE_URL, on_plot=None, concurrency=1, seen_options=(), on_records=None, district_name=None, taluka_name=None, village_code=None, rate=PLOT_RATE):
+    # Villages without a code from the hierarchy index are resolved by walking the dropdown requests,
+    # which stand in for the page navigation of the browser engine
+    if village_code is None:
+        with stage_span('dropdown_navigation'):
+            district_name, taluka_name, village_code = resolve_village(session, district_index, taluka_index, village_name, base_url)
+    if village_code is None:
+        log(f"Village '{village_name}' not found")
+        return district_name, taluka_name, None
+
+    with stage_span('map_load'):
+        plot_options = fetch_plot_options(session, village_code, base_url)
+    plot_option_texts = [plot_option_text for _, plot_option_text in plot_options]
+
+    # Plot options scraped by an earlier attempt are skipped
+    pending_plots = [
+        (plot_index, survey_number, plot_option_text)
+        for plot_index, (survey_number, plot_option_text) in enumerate(plot_options, start=1)
+        if plot_option_text not in seen_options
+    ]
+
+    # Fetch many survey numbers at once when a concurrency above one is requested
+    if concurrency > 1:
+        from async_plot_fetcher import fetch_plots
+        fetch_plots(village_code, pending_plots, plot_data, log, base_url=base_url, concurrency=concurrency, rate=rate, on_plot=on_plot, on_records=on_records)
+        return district_name, taluka_name, plot_option_texts
+
+    for plot_index, survey_number, plot_option_text in pending_plots:
+        if on_plot is not None:
+            on_plot(plot_index, plot_option_text)
+        plot_start_time = time.time()
+        try:
+            with stage_span('plotinfo_wait'):
+                plot_info_text = fetch_plot_info(session, village_code, survey_number, base_url)
+        except requests.RequestException as e:
+            log(f"Error fetching plot info for village '{village_name}', option: {plot_option_text}: {e}")
+            report_plot_timeout()
+            continue
+        report_plot_latency(time.time() - plot_start_time)
+
+        with stage_span('parse'):
+            plot_records = parse_plot_info_text(plot_info_text)
+        if plot_records:
+            log(f"Plot info: {plot_records[-1]}", PLOT_INFO)
+            plot_data.extend(plot_records)
+        if on_records is not None:
+            on_records(plot_index, plot_option_text, plot_records)
+
+    return district_name, taluka_name, plot_option_texts
@@ -0,0 +1,359 @@
+import os
+import re
+import ast
+import json
+import time
+import random
+import argparse
+from urllib.parse import parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import pandas as pd
+from http_engine import STATE_CODE, LEVEL_OPTIONS_PATH, PLOT_OPTIONS_PATH, PLOT_INFO_PATH
+from plot_parser import PLOT_FIELDS, format_plot_info_text
+
+# Port the mock site listens on, apart from the coordinator port so both can run on one machine, and the fixture it serves
+MOCK_SITE_PORT = 8780
+MOCK_FIXTURE_FILE = 'mock_site_fixture.json'
+
+# Seconds a request hangs when a timeout is injected, longer than the 20 s plot info wait of the scraper
+HANG_SECONDS = 30
+
+# Stand-in for index.html with the dropdowns, the map viewport and the #plotinfo panel the scraper reads.
+# Like the real page, every dropdown is rebuilt from the rest/ endpoints when the one above it changes.
+INDEX_HTML = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>Mock Bhunaksha</title></head>
+<body>
+<select id="level_0"></select>
+<select id="level_1"></select>
+<select id="level_2"></select>
+<select id="level_3"></select>
+<select id="level_4"></select>
+<div id="map"></div>
+<select id="surveyNumber"></select>
+<div id="plotinfo"></div>
+<script>
+var STATE = "%(state)s";
+
+function post(path, data) {
+    return fetch(path, {
+        method: "POST",
+        headers: {"Content-Type": "application/x-www-form-urlencoded", "X-Requested-With": "XMLHttpRequest"},
+        body: new URLSearchParams(data)
+    }).then(function (response) {
+        if (!response.ok) {
+            throw new Error(response.status);
+        }
+        return response.text();
+    });
+}
+
+function fill(id, options, placeholder) {
+    var select = document.getElementById(id);
+    while (select.firstChild) {
+        select.removeChild(select.firstChild);
+    }
+    if (placeholder) {
+        select.appendChild(new Option(placeholder, ""));
+    }
+    options.forEach(function (option) {
+        select.appendChild(new Option(option.value, option.code));
+    });
+}
+
+function selectedCodes(level) {
+    var codes = [];
+    for (var index = 0; index < level; index++) {
+        codes.push(document.getElementById("level_" + index).value);
+    }
+    return codes;
+}
+
+function loadLevel(level) {
+    var codes = selectedCodes(level);
+    post("%(level_path)s", {state: STATE, level: level, codes: codes.join(",") + (codes.length ? "," : "")}).then(function (body) {
+        fill("level_" + level, JSON.parse(body), level >= 2 ? "--Select--" : null);
+    });
+}
+
+function showMap() {
+    var map = document.getElementById("map");
+    while (map.firstChild) {
+        map.removeChild(map.firstChild);
+    }
+    var viewport = document.createElement("div");
+    viewport.className = "ol-viewport";
+    map.appendChild(viewport);
+}
+
+[0, 1, 2, 3].forEach(function (level) {
+    document.getElementById("level_" + level).addEventListener("change", function () {
+        loadLevel(level + 1);
+    });
+});
+
+document.getElementById("level_4").addEventListener("change", function () {
+    var village = this.value;
+    showMap();
+    post("%(plot_options_path)s", {state: STATE, giscode: village}).then(function (body) {
+        fill("surveyNumber", JSON.parse(body), "--Select--");
+    });
+});
+
+document.getElementById("surveyNumber").addEventListener("change", function () {
+    post("%(plot_info_path)s", {state: STATE, giscode: document.getElementById("level_4").value, plotno: this.value}).then(function (body) {
+        document.getElementById("plotinfo").innerHTML = JSON.parse(body).info;
+    }, function () {
+        // A dropped connection stands for a crashed tab, the page goes away under the scraper
+        window.location.replace("about:blank");
+    });
+});
+
+loadLevel(0);
+</script>
+</body>
+</html>
+"""
+
+# Function to create a fixture node
+def make_fixture_node(code, name, children_key=None, children=None):
+    node = {"code": code, "name": name}
+    if children_key is not None:
+        node[children_key] = children
+    return node
+
+# Function to group village records into (survey number, #plotinfo text) plots
+def records_to_plots(records):
+    plots = {}
+    for record in records:
+        survey_number = str(record.get('Survey No.', '')).strip()
+        if not survey_number or survey_number == 'nan':
+            continue
+        plots.setdefault(survey_number, []).append(format_plot_info_text({
+            field: record[field] for field in PLOT_FIELDS if field in record and not pd.isna(record[field])
+        }))
+    return [[survey_number, '\n'.join(texts)] for survey_number, texts in plots.items()]
+
+# Function to split a "<code> <name>" folder or file name into its code, keeping the whole name as the name
+def split_code_name(name, fallback_code):
+    match = re.match(r'(\d+)\s', name)
+    return match.group(1) if match else fallback_code
+
+# Function to build fixture districts from the district/taluka/village.xlsx outputs under a folder
+def load_xlsx_fixture(root, max_villages=None):
+    districts = []
+    district_folders = sorted(
+        folder for folder in os.listdir(root)
+        if os.path.isdir(os.path.join(root, folder)) and re.match(r'\d+\s', folder)
+    )
+    for district_folder in district_folders:
+        district_code = split_code_name(district_folder, district_folder)
+        talukas = []
+        for taluka_folder in sorted(os.listdir(os.path.join(root, district_folder))):
+            taluka_path = os.path.join(root, district_folder, taluka_folder)
+            if not os.path.isdir(taluka_path):
+                continue
+            taluka_code = district_code + split_code_name(taluka_folder, taluka_folder)
+            villages = []
+            for file_name in sorted(os.listdir(taluka_path)):
+                if not file_name.endswith('.xlsx') or (max_villages is not None and len(villages) >= max_villages):
+                    continue
+                village_name = os.path.splitext(file_name)[0]
+                records = pd.read_excel(os.path.join(taluka_path, file_name), dtype=str).to_dict('records')
+                village_code = split_code_name(village_name, f"{taluka_code}-{len(villages) + 1}")
+                villages.append(make_fixture_node(village_code, village_name, "plots", records_to_plots(records)))
+            talukas.append(make_fixture_node(taluka_code, taluka_folder, "villages", villages))
+        districts.append(make_fixture_node(district_code, district_folder, "talukas", talukas))
+    return districts
+
+# Function to build fixture districts from the "Plot info" lines of the logs/district_*/taluka_*/village_*.txt captures
+def load_log_fixture(log_root, max_villages=None):
+    districts = []
+    for district_folder in sorted(os.listdir(log_root)):
+        district_path = os.path.join(log_root, district_folder)
+        if not os.path.isdir(district_path) or not district_folder.startswith('district_'):
+            continue
+        talukas = []
+        for taluka_folder in sorted(os.listdir(district_path)):
+            taluka_path = os.path.join(district_path, taluka_folder)
+            if not os.path.isdir(taluka_path):
+                continue
+            villages = []
+            for file_name in sorted(os.listdir(taluka_path)):
+                if not file_name.endswith('.txt') or (max_villages is not None and len(villages) >= max_villages):
+                    continue
+                records = []
+                with open(os.path.join(taluka_path, file_name), 'r', encoding='utf-8') as file:
+                    for line in file:
+                        # Lines end with ': <timestamp>' after the logged dict
+                        if line.startswith('Plot info: '):
+                            records.append(ast.literal_eval(line[len('Plot info: '):].rsplit('}', 1)[0] + '}'))
+                if records:
+                    village_name = os.path.splitext(file_name)[0]
+                    village_code = f"{district_folder}-{taluka_folder}-{village_name}"
+                    villages.append(make_fixture_node(village_code, village_name, "plots", records_to_plots(records)))
+            if villages:
+                talukas.append(make_fixture_node(f"{district_folder}-{taluka_folder}", taluka_folder, "villages", villages))
+        if talukas:
+            districts.append(make_fixture_node(district_folder, district_folder, "talukas", talukas))
+    return districts
+
+# Function to build and save the fixture of the mock site
+def build_mock_fixture(xlsx_roots=(), log_roots=(), fixture_file=MOCK_FIXTURE_FILE, max_villages=None):
+    districts = []
+    for root in xlsx_roots:
+        districts.extend(load_xlsx_fixture(root, max_villages))
+    for log_root in log_roots:
+        districts.extend(load_log_fixture(log_root, max_villages))
+    fixture = {"districts": districts}
+    with open(fixture_file, 'w', encoding='utf-8') as file:
+        json.dump(fixture, file, ensure_ascii=False)
+    return fixture
+
+# Function to load a saved fixture
+def load_mock_fixture(fixture_file=MOCK_FIXTURE_FILE):
+    with open(fixture_file, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+# Function to index the fixture by the codes the rest/ endpoints are called with
+def index_mock_fixture(fixture):
+    talukas = {}
+    villages = {}
+    for district in fixture["districts"]:
+        for taluka in district["talukas"]:
+            talukas[taluka["code"]] = taluka
+            for village in taluka["villages"]:
+                villages[village["code"]] = {survey_number: text for survey_number, text in village["plots"]}
+    return talukas, villages
+
+# Function to turn fixture nodes into the {code, value} options of the rest/ endpoints
+def nodes_to_options(nodes):
+    return [{"code": node["code"], "value": node["name"]} for node in nodes]
+
+# Request handler serving index.html and the rest/ endpoints from the fixture, with injected latency and failures
+class MockSiteHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    # Headers and body are written separately, Nagle's algorithm would hold the body back on kept-alive connections
+    disable_nagle_algorithm = True
+
+    def send_body(self, status, body, content_type='application/json; charset=utf-8'):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.split('?')[0].endswith('/index.html'):
+            self.send_body(200, self.server.index_html, 'text/html; charset=utf-8')
+        else:
+            self.send_body(404, '{"error": "not found"}')
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        form = {key: values[0] for key, values in parse_qs(self.rfile.read(length).decode('utf-8')).items()}
+        path = self.path.split('?')[0]
+
+        # Every rest/ call waits for the configured latency plus jitter
+        time.sleep(self.server.latency + random.uniform(0, self.server.jitter))
+
+        if path.endswith(LEVEL_OPTIONS_PATH):
+            self.send_body(200, json.dumps(self.level_options(int(form.get('level', 0)), form.get('codes', '')), ensure_ascii=False))
+        elif path.endswith(PLOT_OPTIONS_PATH):
+            plots = self.server.villages.get(form.get('giscode'), {})
+            self.send_body(200, json.dumps([{"code": survey_number, "value": survey_number} for survey_number in plots], ensure_ascii=False))
+        elif path.endswith(PLOT_INFO_PATH):
+            self.plot_info(form.get('giscode'), form.get('plotno'))
+        else:
+            self.send_body(404, '{"error": "not found"}')
+
+    def level_options(self, level, codes):
+        codes = [code for code in codes.split(',') if code]
+        if level == 0:
+            return [{"code": STATE_CODE, "value": "महाराष्ट्र"}]
+        if level == 1:
+            # The scraper waits for two options in this dropdown
+            return [{"code": "R", "value": "ग्रामीण"}, {"code": "U", "value": "शहरी"}]
+        if level == 2:
+            return nodes_to_options(self.server.fixture["districts"])
+        if level == 3:
+            district = next((district for district in self.server.fixture["districts"] if district["code"] == codes[2]), None)
+            return nodes_to_options(district["talukas"]) if district else []
+        taluka = self.server.talukas.get(codes[3])
+        return nodes_to_options(taluka["villages"]) if taluka else []
+
+    def plot_info(self, village_code, survey_number):
+        failure = random.random()
+        if failure < self.server.discard_rate:
+            # Drop the connection, which the page turns into a discarded tab
+            self.close_connection = True
+            return
+        failure -= self.server.discard_rate
+        if failure < self.server.timeout_rate:
+            time.sleep(self.server.hang_seconds)
+        elif failure < self.server.timeout_rate + self.server.error_rate:
+            self.send_body(503, '{"error": "injected"}')
+            return
+        text = self.server.villages.get(village_code, {}).get(survey_number)
+        if text is None:
+            self.send_body(404, '{"error": "unknown plot"}')
+            return
+        self.send_body(200, json.dumps({"info": text.replace('\n', '<br>')}, ensure_ascii=False))
+
+    def log_message(self, format, *args):
+        pass
+
+# Function to create the mock site server
+def create_mock_site(fixture, host='127.0.0.1', port=MOCK_SITE_PORT, latency=0.0, jitter=0.0, timeout_rate=0.0, error_rate=0.0, discard_rate=0.0, hang_seconds=HANG_SECONDS):
+    server = ThreadingHTTPServer((host, port), MockSiteHandler)
+    server.daemon_threads = True
+    server.fixture = fixture
+    server.talukas, server.villages = index_mock_fixture(fixture)
+    server.index_html = INDEX_HTML % {
+        "state": STATE_CODE,
+        "level_path": LEVEL_OPTIONS_PATH,
+        "plot_options_path": PLOT_OPTIONS_PATH,
+        "plot_info_path": PLOT_INFO_PATH,
+    }
+    server.latency = latency
+    server.jitter = jitter
+    server.timeout_rate = timeout_rate
+    server.error_rate = error_rate
+    server.discard_rate = discard_rate
+    server.hang_seconds = hang_seconds
+    return server
+
+# Function to get the base URL the scraper is pointed at for a mock site server
+def get_mock_base_url(server):
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}/27/"
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a local stand-in of the mahabhunakasha site from saved village data")
+    parser.add_argument("--fixture", default=MOCK_FIXTURE_FILE, help="Fixture file, built from --xlsx-root and --log-root when they are given")
+    parser.add_argument("--xlsx-root", nargs='*', default=[], help="Folders holding district/taluka/village.xlsx outputs")
+    parser.add_argument("--log-root", nargs='*', default=[], help="Folders holding district_*/taluka_*/village_*.txt logs")
+    parser.add_argument("--max-villages", type=int, help="Villages taken per taluka")
+    parser.add_argument("--host", default='127.0.0.1', help="Address to listen on")
+    parser.add_argument("--port", type=int, default=MOCK_SITE_PORT, help="Port to listen on")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every rest/ call")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Maximum random seconds added on top of the latency")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="Share of plot info calls that hang past the scraper timeout")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of plot info calls answered with a server error")
+    parser.add_argument("--discard-rate", type=float, default=0.0, help="Share of plot info calls whose connection is dropped, discarding the page")
+    parser.add_argument("--hang-seconds", type=float, default=HANG_SECONDS, help="Seconds an injected timeout hangs")
+    args = parser.parse_args()
+
+    if args.xlsx_root or args.log_root:
+        fixture = build_mock_fixture(args.xlsx_root, args.log_root, args.fixture, args.max_villages)
+    else:
+        fixture = load_mock_fixture(args.fixture)
+
+    server = create_mock_site(fixture, args.host, args.port, args.latency, args.jitter, args.timeout_rate, args.error_rate, args.discard_rate, args.hang_seconds)
+    print(f"Serving {len(server.villages)} villages at {get_mock_base_url(server)}index.html")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,97 @@
+from selenium.common.exceptions import TimeoutException
+
+# Script resolving as soon as the element matching a selector exists and, for a select, has enough options.
+# It checks once, then re-checks on every DOM mutation instead of being polled over the WebDriver wire.
+WAIT_FOR_ELEMENT_SCRIPT = """
+    var selector = arguments[0], minOptions = arguments[1], timeoutMs = arguments[2];
+    var done = arguments[arguments.length - 1];
+    function isReady() {
+        var element = document.querySelector(selector);
+        return !!element && (!minOptions || (element.options && element.options.length >= minOptions));
+    }
+    if (isReady()) {
+        done(true);
+        return;
+    }
+    var timer;
+    var observer = new MutationObserver(function () {
+        if (isReady()) {
+            observer.disconnect();
+            clearTimeout(timer);
+            done(true);
+        }
+    });
+    observer.observe(document.documentElement, {childList: true, subtree: true});
+    timer = setTimeout(function () {
+        observer.disconnect();
+        done(false);
+    }, timeoutMs);
+"""
+
+# Script resolving as soon as an element has been removed from the document
+WAIT_FOR_DETACHED_SCRIPT = """
+    var element = arguments[0], timeoutMs = arguments[1];
+    var done = arguments[arguments.length - 1];
+    if (!document.contains(element)) {
+        done(true);
+        return;
+    }
+    var timer;
+    var observer = new MutationObserver(function () {
+        if (!document.contains(element)) {
+            observer.disconnect();
+            clearTimeout(timer);
+            done(true);
+        }
+    });
+    observer.observe(document.documentElement, {childList: true, subtree: true});
+    timer = setTimeout(function () {
+        observer.disconnect();
+        done(false);
+    }, timeoutMs);
+"""
+
+# Seconds the WebDriver waits for a script beyond the script's own timeout
+SCRIPT_TIMEOUT_MARGIN = 5
+
+# Seconds of the usual wait, the script timeout every browser session starts with
+DEFAULT_WAIT_TIMEOUT = 20
+
+# WebDriver script timeout last set on each browser session, keyed by session id
+script_timeouts = {}
+
+# Function to make the WebDriver script timeout of a session cover a wait, only calling the driver when it must grow.
+# The scripts resolve on their own timeout, so a longer WebDriver timeout left from an earlier wait is harmless.
+def set_script_timeout(driver, timeout=DEFAULT_WAIT_TIMEOUT):
+    script_timeout = timeout + SCRIPT_TIMEOUT_MARGIN
+    if script_timeouts.get(driver.session_id, 0) < script_timeout:
+        driver.set_script_timeout(script_timeout)
+        script_timeouts[driver.session_id] = script_timeout
+
+# Function to drop the script timeout of a browser session that is being closed
+def forget_script_timeout(driver):
+    script_timeouts.pop(driver.session_id, None)
+
+# Function to run one of the waiting scripts within the WebDriver script timeout
+def run_wait_script(driver, script, timeout, *args):
+    set_script_timeout(driver, timeout)
+    return driver.execute_async_script(script, *args, int(timeout * 1000))
+
+# Function to wait until an element matching a CSS selector exists, returning whether it appeared in time
+def wait_for_selector(driver, selector, timeout=DEFAULT_WAIT_TIMEOUT):
+    return bool(run_wait_script(driver, WAIT_FOR_ELEMENT_SCRIPT, timeout, selector, 0))
+
+# Function to wait until an element exists, raising TimeoutException like WebDriverWait does
+def wait_for_element(driver, element_id, timeout=DEFAULT_WAIT_TIMEOUT):
+    if not wait_for_selector(driver, f'#{element_id}', timeout):
+        raise TimeoutException(f"Element '{element_id}' not present after {timeout}s")
+
+# Function to wait until a dropdown is populated with at least min_options options
+def wait_for_options(driver, element_id, min_options=2, timeout=DEFAULT_WAIT_TIMEOUT):
+    if not run_wait_script(driver, WAIT_FOR_ELEMENT_SCRIPT, timeout, f'#{element_id}', min_options):
+        raise TimeoutException(f"Dropdown '{element_id}' not populated after {timeout}s")
+
+# Function to wait until an element has been removed from the page
+def wait_for_detached(driver, element, timeout=DEFAULT_WAIT_TIMEOUT):
+    if not run_wait_script(driver, WAIT_FOR_DETACHED_SCRIPT, timeout, element):
+        raise TimeoutException(f"Element still attached after {timeout}s")
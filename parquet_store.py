@@ -0,0 +1,93 @@
+import os
+import argparse
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pyarrow.dataset as ds
+
+# Root folder of the partitioned Parquet dataset
+PARQUET_ROOT = "parquet_data"
+
+# Fixed schema of the plot records of one village file
+PLOT_SCHEMA = pa.schema([
+    ('village', pa.string()),
+    ('Survey No.', pa.string()),
+    ('Total Area', pa.float64()),
+    ('Pot kharaba', pa.float64()),
+    ('Owner Name', pa.string()),
+    ('Khata No.', pa.string()),
+])
+
+# Columns read back from the district/taluka partition folders
+PARTITIONING = ds.partitioning(pa.schema([('district', pa.string()), ('taluka', pa.string())]), flavor='hive')
+
+# Function to get the folder of a district/taluka partition
+def get_partition_path(root, district_name, taluka_name):
+    return os.path.join(root, f'district={district_name}', f'taluka={taluka_name}')
+
+# Function to coerce village records to the fixed plot schema
+def village_records_to_table(village_df, village_name):
+    village_df = village_df.reindex(columns=[field.name for field in PLOT_SCHEMA if field.name != 'village'])
+    columns = {
+        'village': pd.Series([village_name] * len(village_df), dtype=object),
+        'Survey No.': village_df['Survey No.'].astype('string'),
+        'Total Area': pd.to_numeric(village_df['Total Area'], errors='coerce'),
+        'Pot kharaba': pd.to_numeric(village_df['Pot kharaba'], errors='coerce'),
+        'Owner Name': village_df['Owner Name'].astype('string'),
+        'Khata No.': village_df['Khata No.'].astype('string'),
+    }
+    return pa.Table.from_pydict({name: pa.array(column, type=PLOT_SCHEMA.field(name).type, from_pandas=True) for name, column in columns.items()}, schema=PLOT_SCHEMA)
+
+# Function to write the records of a village as one file of its district/taluka partition
+def save_village_parquet(village_df, root, district_name, taluka_name, village_name):
+    return save_village_parquet_frames([village_df], root, district_name, taluka_name, village_name)
+
+# Function to write a village streamed as several data frames, one row group each, as one file of its partition
+def save_village_parquet_frames(village_frames, root, district_name, taluka_name, village_name):
+    partition_path = get_partition_path(root, district_name, taluka_name)
+    os.makedirs(partition_path, exist_ok=True)
+    file_path = os.path.join(partition_path, f'{village_name}.parquet')
+
+    # Write to a temporary file first so readers never see a half written village
+    temp_path = file_path + '.tmp'
+    with pq.ParquetWriter(temp_path, PLOT_SCHEMA, compression='zstd') as writer:
+        for village_df in village_frames:
+            writer.write_table(village_records_to_table(village_df, village_name))
+    os.replace(temp_path, file_path)
+    return file_path
+
+# Function to list the villages of a taluka already stored in the dataset
+def get_parquet_villages(root, district_name, taluka_name):
+    partition_path = get_partition_path(root, district_name, taluka_name)
+    if not os.path.exists(partition_path):
+        return []
+    return [os.path.splitext(file)[0] for file in os.listdir(partition_path) if file.endswith('.parquet')]
+
+# Function to read the dataset, optionally restricted to one district or taluka, as a DataFrame
+def read_plot_dataset(root=PARQUET_ROOT, district_name=None, taluka_name=None):
+    dataset = ds.dataset(root, format='parquet', partitioning=PARTITIONING, exclude_invalid_files=True)
+    expression = None
+    for field, value in (('district', district_name), ('taluka', taluka_name)):
+        if value is not None:
+            condition = ds.field(field) == value
+            expression = condition if expression is None else expression & condition
+    return dataset.to_table(filter=expression).to_pandas()
+
+# Function to export the dataset as one Excel workbook per village in district/taluka folders
+def export_excel(root, output_directory, district_name=None):
+    plots = read_plot_dataset(root, district_name)
+    for (district, taluka, village), village_df in plots.groupby(['district', 'taluka', 'village'], sort=True):
+        taluka_path = os.path.join(output_directory, district, taluka)
+        os.makedirs(taluka_path, exist_ok=True)
+        village_df = village_df.drop(columns=['district', 'taluka', 'village'])
+        with pd.ExcelWriter(os.path.join(taluka_path, f'{village}.xlsx')) as writer:
+            village_df.to_excel(writer, sheet_name=village, index=False)
+        print(f"Exported village '{village}' of taluka '{taluka}'")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the Parquet plot dataset to one Excel workbook per village")
+    parser.add_argument("--root", default=PARQUET_ROOT, help="Root folder of the Parquet dataset")
+    parser.add_argument("--output", default=".", help="Folder to write the district/taluka/village workbooks to")
+    parser.add_argument("--district", help="Only export this district")
+    args = parser.parse_args()
+    export_excel(args.root, args.output, args.district)
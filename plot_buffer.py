@@ -0,0 +1,123 @@
+import os
+import json
+import hashlib
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+from plot_parser import PLOT_FIELDS, PlotRecord, plot_records_to_frame
+
+# Unique records a village keeps in memory before they are spilled to its segment file
+PLOT_BUFFER_RECORDS = 2000
+
+# Records read back per batch when the village output is assembled
+ASSEMBLY_BATCH_RECORDS = 2000
+
+# Attributes identifying a duplicate record, the first record of a survey number, khata and owner is kept
+DEDUP_ATTRIBUTES = ('survey_no', 'khata_no', 'owner_name')
+
+# Suffix of the segment file next to the checkpoint of a village
+SEGMENT_SUFFIX = '.segment'
+
+# Header style of the village workbooks, the same as pandas gives them
+HEADER_FONT = Font(bold=True)
+HEADER_BORDER = Border(left=Side(style='thin'), right=Side(style='thin'), top=Side(style='thin'), bottom=Side(style='thin'))
+HEADER_ALIGNMENT = Alignment(horizontal='center', vertical='top')
+
+# Function to get the segment file of a village from its checkpoint path
+def get_segment_path(checkpoint_path):
+    return os.path.splitext(checkpoint_path)[0] + SEGMENT_SUFFIX
+
+# Function to hash the dedup attributes of a record to a 64-bit key
+def get_record_key(record):
+    values = '\x1f'.join('' if getattr(record, attribute) is None else str(getattr(record, attribute)) for attribute in DEDUP_ATTRIBUTES)
+    return int.from_bytes(hashlib.blake2b(values.encode('utf-8'), digest_size=8).digest(), 'little')
+
+# Unique records of one village, kept in memory up to a bound and spilled to an append-only segment beyond it.
+# It stands in for the plot_data list, so the engines keep calling extend on it.
+class PlotBuffer:
+    def __init__(self, segment_path, max_records=PLOT_BUFFER_RECORDS):
+        self.segment_path = segment_path
+        self.max_records = max_records
+        self.records = []
+        self.keys = set()
+        self.segment_file = None
+        self.spilled_records = 0
+        self.duplicate_records = 0
+
+    def __len__(self):
+        return self.spilled_records + len(self.records)
+
+    # Add the records of a plot, dropping the ones already seen
+    def extend(self, plot_records):
+        for record in plot_records:
+            key = get_record_key(record)
+            if key in self.keys:
+                self.duplicate_records += 1
+                continue
+            self.keys.add(key)
+            self.records.append(record)
+        if len(self.records) >= self.max_records:
+            self.spill()
+
+    # Append the records in memory to the segment, one JSON array of the field values per line
+    def spill(self):
+        if not self.records:
+            return
+        if self.segment_file is None:
+            # A segment left by an earlier attempt is rebuilt from the checkpoint, so it is truncated
+            os.makedirs(os.path.dirname(self.segment_path) or '.', exist_ok=True)
+            self.segment_file = open(self.segment_path, 'w', encoding='utf-8')
+        self.segment_file.writelines(json.dumps(record.to_tuple(), ensure_ascii=False) + '\n' for record in self.records)
+        self.segment_file.flush()
+        self.spilled_records += len(self.records)
+        self.records = []
+
+    # Stream the records in insertion order, the spilled ones first, in lists of at most batch_records
+    def iter_batches(self, batch_records=ASSEMBLY_BATCH_RECORDS):
+        if self.segment_file is not None:
+            self.segment_file.flush()
+            with open(self.segment_path, 'r', encoding='utf-8') as file:
+                batch = []
+                for line in file:
+                    batch.append(PlotRecord(*json.loads(line)))
+                    if len(batch) >= batch_records:
+                        yield batch
+                        batch = []
+                if batch:
+                    yield batch
+        for start in range(0, len(self.records), batch_records):
+            yield self.records[start:start + batch_records]
+
+    # Stream the records as data frames with the village columns
+    def iter_frames(self, batch_records=ASSEMBLY_BATCH_RECORDS):
+        for batch in self.iter_batches(batch_records):
+            yield plot_records_to_frame(batch)
+
+    # Close and remove the segment
+    def close(self):
+        if self.segment_file is not None:
+            self.segment_file.close()
+            self.segment_file = None
+        if os.path.exists(self.segment_path):
+            os.remove(self.segment_path)
+
+# Function to write the records of a village to a workbook row by row, without building its data frame
+def write_village_workbook(plot_buffer, file_path, sheet_name):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_name)
+    header = []
+    for field in PLOT_FIELDS:
+        cell = WriteOnlyCell(sheet, value=field)
+        cell.font = HEADER_FONT
+        cell.border = HEADER_BORDER
+        cell.alignment = HEADER_ALIGNMENT
+        header.append(cell)
+    sheet.append(header)
+    for batch in plot_buffer.iter_batches():
+        for record in batch:
+            sheet.append(record.to_tuple())
+
+    # Write to a temporary file first so an interrupted save never leaves a village workbook behind
+    temp_path = file_path + '.tmp'
+    workbook.save(temp_path)
+    os.replace(temp_path, file_path)
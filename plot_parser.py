@@ -0,0 +1,179 @@
+import re
+import ast
+import argparse
+from collections import Counter
+import pandas as pd
+
+# Fields of the #plotinfo panel in column order, with the record attribute each one is stored in
+PLOT_FIELDS = ('Survey No.', 'Total Area', 'Pot kharaba', 'Owner Name', 'Khata No.')
+PLOT_FIELD_ATTRIBUTES = {
+    'Survey No.': 'survey_no',
+    'Total Area': 'total_area',
+    'Pot kharaba': 'pot_kharaba',
+    'Owner Name': 'owner_name',
+    'Khata No.': 'khata_no',
+}
+AREA_FIELDS = ('Total Area', 'Pot kharaba')
+
+# One pattern for every known line, splitting on the first colon only so values may contain ': '.
+# Like the startswith checks it replaces, a label may carry a suffix such as 'Total Area (H.R.P)' before the colon.
+PLOT_FIELD_PATTERN = re.compile(r'\s*(?P<field>' + '|'.join(re.escape(field) for field in PLOT_FIELDS) + r')[^:]*:\s*(?P<value>.*?)\s*$')
+
+# #plotinfo texts in the shapes the panel has shown, checked against the reference parser on every run of the check
+RAW_PLOT_INFO_SAMPLES = (
+    "Survey No.: 12/1\nTotal Area: 0.4200\nPot kharaba: 0.0100\nOwner Name: राम पाटील\nKhata No.: 345",
+    "Survey No. : 7\nTotal Area (H.R.P): 1.2000\nPot kharaba (H.R.P): 0.0000\nOwner Name: सीता जाधव\nKhata No.: 12\nSurvey No.: 8\nTotal Area (H.R.P): 0.5000\nOwner Name: गणेश शिंदे: वारस\nKhata No.: 13",
+    "Village: गाव\nSurvey No.: 3A\nTotal Area(Hectare): 2.0000\nOwner Names: विठ्ठल पवार\nKhata No.: 1",
+)
+
+# Unparsed lines of this process, counted by the text before their colon
+unknown_line_counts = Counter()
+
+# Compact record of one survey number
+class PlotRecord:
+    __slots__ = ('survey_no', 'total_area', 'pot_kharaba', 'owner_name', 'khata_no')
+
+    def __init__(self, survey_no=None, total_area=None, pot_kharaba=None, owner_name=None, khata_no=None):
+        self.survey_no = survey_no
+        self.total_area = total_area
+        self.pot_kharaba = pot_kharaba
+        self.owner_name = owner_name
+        self.khata_no = khata_no
+
+    # Values in PLOT_FIELDS order
+    def to_tuple(self):
+        return (self.survey_no, self.total_area, self.pot_kharaba, self.owner_name, self.khata_no)
+
+    # Dict keyed by the panel field names, leaving out missing fields like the old parser did
+    def to_dict(self):
+        return {field: value for field, value in zip(PLOT_FIELDS, self.to_tuple()) if value is not None}
+
+    @classmethod
+    def from_dict(cls, values):
+        record = cls()
+        for field, value in values.items():
+            if field in PLOT_FIELD_ATTRIBUTES:
+                setattr(record, PLOT_FIELD_ATTRIBUTES[field], parse_area(value) if field in AREA_FIELDS else str(value).strip())
+        return record
+
+    def __eq__(self, other):
+        return isinstance(other, PlotRecord) and self.to_tuple() == other.to_tuple()
+
+    def __repr__(self):
+        return repr(self.to_dict())
+
+# Function to parse an area value such as '0.1220' to a float, None if it is not a number
+def parse_area(value):
+    if value is None or isinstance(value, float):
+        return value
+    try:
+        return float(str(value).replace(',', ''))
+    except ValueError:
+        return None
+
+# Function to stream the records of a #plotinfo text, one per survey number
+def iter_plot_records(plot_info_text, unknown_lines=unknown_line_counts):
+    record = None
+    for line in plot_info_text.splitlines():
+        match = PLOT_FIELD_PATTERN.match(line)
+        if match is None:
+            if line.strip():
+                unknown_lines[line.split(':', 1)[0].strip()[:40]] += 1
+            continue
+        field, value = match.group('field', 'value')
+
+        # Every survey number starts a new record
+        if field == 'Survey No.':
+            if record is not None:
+                yield record
+            record = PlotRecord(survey_no=value)
+            continue
+        if record is None:
+            record = PlotRecord()
+        setattr(record, PLOT_FIELD_ATTRIBUTES[field], parse_area(value) if field in AREA_FIELDS else value)
+
+    if record is not None:
+        yield record
+
+# Function to parse the text of the #plotinfo panel into one record per survey number
+def parse_plot_info_text(plot_info_text):
+    return list(iter_plot_records(plot_info_text))
+
+# Function to build the data frame of a village from its records
+def plot_records_to_frame(plot_records):
+    return pd.DataFrame.from_records([record.to_tuple() for record in plot_records], columns=list(PLOT_FIELDS))
+
+# Function to rebuild the #plotinfo text of a record logged as a dict by the old parser
+def format_plot_info_text(values):
+    return '\n'.join(f"{field}: {values[field]}" for field in PLOT_FIELDS if field in values)
+
+# Function to parse a #plotinfo text the way the scraper did before the compiled pattern, splitting on the first ': ' only.
+# It is kept as the reference the check compares the pattern against.
+def parse_plot_info_text_reference(plot_info_text):
+    plot_records = []
+    current_plot_info = {}
+    for line in plot_info_text.split('\n'):
+        for field in PLOT_FIELDS:
+            if line.startswith(field) and ': ' in line:
+                if field == 'Survey No.':
+                    if current_plot_info:
+                        plot_records.append(current_plot_info)
+                    current_plot_info = {}
+                current_plot_info[field] = line.split(': ', 1)[1]
+                break
+    if current_plot_info:
+        plot_records.append(current_plot_info)
+    return [PlotRecord.from_dict(values) for values in plot_records]
+
+# Function to check the parser against the reference parser on raw #plotinfo texts and return the mismatching texts
+def check_raw_plot_info(plot_info_texts):
+    checked = 0
+    mismatches = []
+    for plot_info_text in plot_info_texts:
+        parsed = parse_plot_info_text(plot_info_text)
+        expected = parse_plot_info_text_reference(plot_info_text)
+        checked += 1
+        if parsed != expected:
+            mismatches.append((plot_info_text, expected, parsed))
+    return checked, mismatches
+
+# Function to check the parser against the "Plot info" lines of old logs and return the mismatching records.
+# The logged dicts are rebuilt into the canonical label shape, so this only guards values, not label variants.
+
+def check_logged_plot_info(log_paths):
+    checked = 0
+    mismatches = []
+    for log_path in log_paths:
+        with open(log_path, 'r', encoding='utf-8') as file:
+            for line in file:
+                if not line.startswith('Plot info: '):
+                    continue
+                # Lines end with ': <timestamp>' after the logged dict
+                logged = ast.literal_eval(line[len('Plot info: '):].rsplit('}', 1)[0] + '}')
+                parsed = parse_plot_info_text(format_plot_info_text(logged))
+                checked += 1
+                if parsed != [PlotRecord.from_dict(logged)]:
+                    mismatches.append((log_path, logged, parsed))
+    return checked, mismatches
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the plot info parser against the reference parser and the records of old village logs")
+    parser.add_argument("logs", nargs='*', help="Village log files with 'Plot info' lines")
+    parser.add_argument("--raw", nargs='+', default=[], help="Files each holding the text of one #plotinfo panel")
+    args = parser.parse_args()
+
+    raw_texts = list(RAW_PLOT_INFO_SAMPLES)
+    for raw_path in args.raw:
+        with open(raw_path, 'r', encoding='utf-8') as file:
+            raw_texts.append(file.read())
+    checked, mismatches = check_raw_plot_info(raw_texts)
+    for plot_info_text, expected, parsed in mismatches[:20]:
+        print(f"{plot_info_text!r}: expected {expected}, parsed {parsed}")
+    print(f"{checked} raw texts checked, {len(mismatches)} mismatches")
+
+    if args.logs:
+        checked, mismatches = check_logged_plot_info(args.logs)
+        for log_path, logged, parsed in mismatches[:20]:
+            print(f"{log_path}: logged {logged}, parsed {parsed}")
+        print(f"{checked} logged records checked, {len(mismatches)} mismatches")
+    print(f"Unknown lines: {dict(unknown_line_counts)}")
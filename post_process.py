@@ -1,7 +1,11 @@
 import os
+import json
+import hashlib
+import argparse
+import multiprocessing
 import pandas as pd
-from indic_transliteration import sanscript
-from indic_transliteration.sanscript import transliterate
+from hierarchy_index import HIERARCHY_INDEX_FILE, load_hierarchy_index, find_taluka_villages_by_name
+from transliteration_cache import transliterate_name, remember_transliterations, save_transliteration_cache
 
 # Define the categories based on land holding (in hectares)
 categories = {
@@ -12,32 +16,43 @@ categories = {
     "Large": (10, float('inf'))
 }
 
-# Function to categorize total area
-def categorize_area(total_area):
-    for category, (min_area, max_area) in categories.items():
-        if min_area <= total_area < max_area:
-            return category
-    return None
+# Bin edges and labels of the categories for vectorized binning
+category_names = list(categories.keys())
+category_bins = [min_area for min_area, _ in categories.values()] + [list(categories.values())[-1][1]]
+
+# Version of the cached village rows, bump it when the aggregation changes
+MANIFEST_VERSION = 1
+
+# Village file extensions written by the scraper
+VILLAGE_FILE_EXTENSIONS = ('.xlsx', '.parquet')
+
+# Function to read a village file written either as an Excel workbook or to the Parquet dataset
+def read_village_file(file_path):
+    if file_path.endswith('.parquet'):
+        return pd.read_parquet(file_path)
+    return pd.read_excel(file_path)
 
 # Function to process each village file and return the processed data
 def process_village_file(file_path, taluka_name_marathi, taluka_name_english):
     village_code, village_name_marathi = os.path.splitext(os.path.basename(file_path))[0].split(' ', 1)
-    village_name_english = transliterate(village_name_marathi, sanscript.DEVANAGARI, sanscript.ITRANS).title().replace("-", "")
+    village_name_english = transliterate_name(village_name_marathi)
     
     # Remove the last two zeros from the village code
     village_code = village_code[:-2]
     
-    df = pd.read_excel(file_path)
-    
-    area_sums = {category: 0 for category in categories}
-    area_counts = {category: 0 for category in categories}
-    
-    for index, row in df.iterrows():
-        total_area = float(row['Total Area'])
-        category = categorize_area(total_area)
-        if category:
-            area_sums[category] += total_area
-            area_counts[category] += 1
+    df = read_village_file(file_path)
+
+    # Areas that are missing or not numbers are left out of every category
+    if 'Total Area' in df.columns:
+        total_area = pd.to_numeric(df['Total Area'], errors='coerce')
+    else:
+        total_area = pd.Series(dtype=float)
+
+    # Bin the areas into the half-open category ranges and aggregate each bin
+    area_category = pd.cut(total_area, bins=category_bins, labels=category_names, right=False)
+    aggregated = total_area.groupby(area_category, observed=False).agg(['sum', 'count'])
+    area_sums = aggregated['sum'].reindex(category_names, fill_value=0).astype(float).to_dict()
+    area_counts = aggregated['count'].reindex(category_names, fill_value=0).astype(int).to_dict()
     
     return {
         "village_code": village_code,
@@ -49,36 +64,136 @@ def process_village_file(file_path, taluka_name_marathi, taluka_name_english):
         **{f"{category}_count": count for category, count in area_counts.items()}
     }
 
-# Function to process all village files in a taluka and return the processed data
-def process_taluka_files(taluka_path):
-    taluka_name_full = os.path.basename(taluka_path)
+# Function to get the Marathi and English names of a taluka from its folder
+def get_taluka_names(taluka_path):
+    # Parquet partitions are named taluka=<name>
+    taluka_name_full = os.path.basename(taluka_path).split('=', 1)[-1]
     taluka_name_number, taluka_name_marathi = taluka_name_full.split(' ', 1)
-    taluka_name_english = transliterate(taluka_name_marathi, sanscript.DEVANAGARI, sanscript.ITRANS).title().replace("-", "")
-    
-    village_files = [os.path.join(taluka_path, f) for f in os.listdir(taluka_path) if f.endswith('.xlsx')]
-    
-    processed_data = []
-    
-    for i, village_file in enumerate(village_files, start=1):
-        print(f"Processing village {i}/{len(village_files)} in taluka '{taluka_name_marathi}'...")
-        processed_data.append(process_village_file(village_file, taluka_name_marathi, taluka_name_english))
-    
-    return processed_data
+    taluka_name_english = transliterate_name(taluka_name_marathi)
+    return taluka_name_marathi, taluka_name_english
 
-if __name__ == "__main__":
-    # Define the root directory where the taluka folders are stored
-    root_directory = "./07 अमरावती"  # Update this path
-    output_csv_file = "./district_data.csv"  # Update this path
-    output_xlsx_file = "./district_data.xlsx"  # Update this path
+# Function to list the village files of a taluka in a stable order
+def list_village_files(taluka_path):
+    return sorted(os.path.join(taluka_path, f) for f in os.listdir(taluka_path) if f.endswith(VILLAGE_FILE_EXTENSIONS))
 
-    taluka_folders = [os.path.join(root_directory, folder) for folder in os.listdir(root_directory) if os.path.isdir(os.path.join(root_directory, folder))]
-    
+# Function to list the taluka folders of a district root directory in a stable order
+def list_taluka_folders(root_directory):
+    return sorted(
+        os.path.join(root_directory, folder) for folder in os.listdir(root_directory)
+        if os.path.isdir(os.path.join(root_directory, folder)) and not folder.startswith('.')
+    )
+
+# Function to list (file, taluka Marathi name, taluka English name) tasks for every village under the root directories
+def collect_village_tasks(root_directories):
+    tasks = []
+    for root_directory in root_directories:
+        for taluka_folder in list_taluka_folders(root_directory):
+            taluka_name_marathi, taluka_name_english = get_taluka_names(taluka_folder)
+            tasks.extend((village_file, taluka_name_marathi, taluka_name_english) for village_file in list_village_files(taluka_folder))
+    return tasks
+
+# Function to process one village task in a pool worker
+def process_village_task(task):
+    return process_village_file(*task)
+
+# Function to process village tasks, in parallel when more than one worker is given
+def process_village_tasks(tasks, workers=1, chunksize=16):
+    print(f"Processing {len(tasks)} villages with {workers} worker(s)...")
+    if workers <= 1:
+        return [process_village_task(task) for task in tasks]
+
+    # imap keeps the results in task order so the output does not depend on scheduling
     all_data = []
+    with multiprocessing.Pool(processes=workers) as pool:
+        for i, row in enumerate(pool.imap(process_village_task, tasks, chunksize=chunksize), start=1):
+            all_data.append(row)
+            if i % 100 == 0 or i == len(tasks):
+                print(f"Processed {i}/{len(tasks)} villages...")
+    return all_data
 
-    for i, taluka_folder in enumerate(taluka_folders, start=1):
-        print(f"Processing taluka {i}/{len(taluka_folders)}...")
-        all_data.extend(process_taluka_files(taluka_folder))
-    
+# Function to load the manifest of cached village rows, starting over if it was written by another version
+def load_manifest(manifest_file):
+    if not manifest_file or not os.path.exists(manifest_file):
+        return {}
+    with open(manifest_file, 'r', encoding='utf-8') as file:
+        manifest = json.load(file)
+    if manifest.get('version') != MANIFEST_VERSION:
+        return {}
+    return manifest.get('villages', {})
+
+# Function to save the manifest of cached village rows
+def save_manifest(manifest_file, villages):
+    temp_file = manifest_file + '.tmp'
+    with open(temp_file, 'w', encoding='utf-8') as file:
+        json.dump({'version': MANIFEST_VERSION, 'villages': villages}, file, ensure_ascii=False)
+    os.replace(temp_file, manifest_file)
+
+# Function to hash the content of a village file
+def hash_file(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+# Function to process all villages under the root directories, reusing the manifest rows of unchanged files
+def process_all_villages(root_directories, workers=1, chunksize=16, manifest_file=None):
+    tasks = collect_village_tasks(root_directories)
+    manifest = load_manifest(manifest_file)
+    updated_manifest = {}
+    rows = [None] * len(tasks)
+    changed = []
+
+    for i, task in enumerate(tasks):
+        village_file, taluka_name_marathi, taluka_name_english = task
+        stat = os.stat(village_file)
+        entry = manifest.get(village_file)
+
+        # A file with the same size and mtime is trusted without reading it
+        if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime_ns:
+            rows[i] = entry['row']
+            updated_manifest[village_file] = entry
+            continue
+
+        # A touched file whose content did not change keeps its cached row
+        content_hash = hash_file(village_file)
+        if entry and entry['sha256'] == content_hash:
+            rows[i] = entry['row']
+            updated_manifest[village_file] = {**entry, 'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+            continue
+
+        changed.append((i, task, {'size': stat.st_size, 'mtime': stat.st_mtime_ns, 'sha256': content_hash}))
+
+    print(f"{len(tasks) - len(changed)} villages unchanged, {len(changed)} new or changed")
+    processed = process_village_tasks([task for _, task, _ in changed], workers, chunksize)
+    for (i, task, fingerprint), row in zip(changed, processed):
+        rows[i] = row
+        updated_manifest[task[0]] = {**fingerprint, 'row': row}
+
+    if manifest_file:
+        save_manifest(manifest_file, updated_manifest)
+    return rows
+
+# Function to print the villages of the hierarchy index that have no village file yet
+def report_missing_villages(root_directories, hierarchy):
+    missing_villages = []
+    for root_directory in root_directories:
+        # Parquet partitions are named district=<name>
+        district_name = os.path.basename(os.path.normpath(root_directory)).split('=', 1)[-1]
+        for taluka_folder in list_taluka_folders(root_directory):
+            taluka_name = os.path.basename(taluka_folder).split('=', 1)[-1]
+            expected_villages = find_taluka_villages_by_name(hierarchy, district_name, taluka_name)
+            if expected_villages is None:
+                print(f"Taluka '{taluka_name}' not found in the hierarchy index")
+                continue
+            scraped_villages = {os.path.splitext(os.path.basename(f))[0] for f in list_village_files(taluka_folder)}
+            missing = [village for village in expected_villages if village not in scraped_villages]
+            print(f"Taluka '{taluka_name}': {len(expected_villages) - len(missing)}/{len(expected_villages)} villages scraped")
+            missing_villages.extend((taluka_name, village) for village in missing)
+    return missing_villages
+
+# Function to save the processed village rows as the district CSV and Excel files
+def save_district_data(all_data, output_csv_file, output_xlsx_file):
     keys = [
         "village_code", "village_name_marathi", "village_name_english", 
         "taluka_name_marathi", "taluka_name_english"
@@ -86,5 +201,30 @@ if __name__ == "__main__":
 
     df = pd.DataFrame(all_data, columns=keys)
     df.to_csv(output_csv_file, index=False, encoding='utf-8-sig')
-    df.to_excel(output_xlsx_file, index=False)
-    print(f"Data processing complete. Output saved to '{output_csv_file}' and '{output_xlsx_file}'.")
+    if output_xlsx_file:
+        df.to_excel(output_xlsx_file, index=False)
+    return df
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aggregate village plot files into district land holding data")
+    parser.add_argument("--root", nargs='+', default=["./07 अमरावती"], help="District root directories holding the taluka folders")
+    parser.add_argument("--output-csv", default="./district_data.csv", help="Path of the output CSV file")
+    parser.add_argument("--output-xlsx", default="./district_data.xlsx", help="Path of the output Excel file, empty to skip it")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of worker processes")
+    parser.add_argument("--chunksize", type=int, default=16, help="Village files handed to a worker at a time")
+    parser.add_argument("--hierarchy-index", default=HIERARCHY_INDEX_FILE, help="Hierarchy index used to report villages that are not scraped yet")
+    parser.add_argument("--manifest", default="./post_process_manifest.json", help="Manifest caching the row of each village file, empty to disable it")
+    args = parser.parse_args()
+
+    all_data = process_all_villages(args.root, args.workers, args.chunksize, args.manifest)
+
+    # Keep the names transliterated by the pool workers for the next run
+    remember_transliterations({row["village_name_marathi"]: row["village_name_english"] for row in all_data})
+    save_transliteration_cache()
+    save_district_data(all_data, args.output_csv, args.output_xlsx)
+
+    # Compare the scraped villages with the villages listed on the site
+    hierarchy = load_hierarchy_index(args.hierarchy_index, ttl_seconds=None)
+    if hierarchy is not None:
+        report_missing_villages(args.root, hierarchy)
+    print(f"Data processing complete. Output saved to '{args.output_csv}'" + (f" and '{args.output_xlsx}'." if args.output_xlsx else "."))
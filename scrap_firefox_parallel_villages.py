@@ -1,101 +1,165 @@
 import os
-import json
 import time
+import socket
+import argparse
+import logging
 import multiprocessing
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.firefox.service import Service
-from selenium.webdriver.firefox.options import Options
-from selenium.webdriver.support.ui import WebDriverWait, Select
-from selenium.webdriver.support import expected_conditions as EC
-import pandas as pd
+import requests
 from datetime import datetime
-from selenium.common.exceptions import (
-    StaleElementReferenceException, NoSuchElementException,
-    TimeoutException, ElementClickInterceptedException, JavascriptException
-)
-
-# Function to print and log current time and message
-def print_and_log_time(message, log_file):
-    current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    log_message = f"{message}: {current_time}"
-    print(log_message)
-    with open(log_file, 'a', encoding='utf-8') as file:
-        file.write(log_message + '\n')
-
-# Function to update the terminal output
-def update_terminal_output(progress_tracker, taluka_path, total_villages, current_taluka_name, current_taluka_index):
-    os.system('cls' if os.name == 'nt' else 'clear')
-    completed_villages = len([file for file in os.listdir(taluka_path) if file.endswith('.xlsx')])
-    print(f"Taluka {current_taluka_index + 1}: {current_taluka_name}")
-    print(f"Completed villages: {completed_villages}/{total_villages}\n")
-    for key, value in progress_tracker.items():
-        print(f"Instance {key}: {json.dumps(value, ensure_ascii=False)}")
+from selenium.common.exceptions import NoSuchElementException, TimeoutException, JavascriptException
+from plot_parser import parse_plot_info_text, plot_records_to_frame, unknown_line_counts
+from plot_buffer import PLOT_BUFFER_RECORDS, PlotBuffer, get_segment_path, write_village_workbook
+from http_engine import BASE_URL, PLOT_RATE, create_http_session, scrape_village_http
+from checkpoint import get_checkpoint_path, load_plot_checkpoint, open_plot_checkpoint, append_plot_checkpoint, remove_plot_checkpoint, count_checkpoint_plots
+from parquet_store import PARQUET_ROOT, save_village_parquet_frames, get_parquet_villages
+from transliteration_cache import transliterate_name, save_transliteration_cache
+from crawl_state import CRAWL_DB_PATH, LEASE_SECONDS, DONE, open_crawl_db, enqueue_villages, mark_villages_done, seed_priorities, reset_in_flight_jobs, reset_failed_jobs, claim_village, renew_lease, start_lease_heartbeat, record_plot_count, complete_job, release_job, count_jobs
+from scrape_logging import PLOT_INFO, LOG_LEVEL, PLOT_LOG_SAMPLE_RATE, print_and_log_time, setup_worker_logging, start_log_listener, stop_log_listener
+from page_readiness import run_wait_script, set_script_timeout, wait_for_selector, wait_for_element, wait_for_options, wait_for_detached
+from hierarchy_index import HIERARCHY_INDEX_FILE, make_node, load_hierarchy_index, save_hierarchy_index, get_taluka_villages, get_district, get_village_code, crawl_hierarchy_http
+from browser_profile import create_firefox_options
+from browser_pool import STANDBY_BROWSERS, BrowserPool
+from concurrency_controller import set_concurrency_control, report_plot_latency, report_plot_timeout, report_browser_crash, is_above_worker_limit, wait_for_worker_slot, start_concurrency_controller, stop_concurrency_controller
+from coordinator import fetch_remote_hierarchy, claim_remote_village, upload_village_results, complete_remote_job, release_remote_job, start_heartbeat, fetch_remote_status
+from stage_metrics import METRICS_PORT, set_metrics_queue, stage_span, flush_stage_metrics, start_metrics_collector, stop_metrics_collector
+from status_dashboard import set_status_queue, report_plot, report_message, report_village_done, report_instance_idle, report_scope, start_status_dashboard, stop_status_dashboard
+
+# Number of villages a worker scrapes before its browser session is rebuilt
+MAX_VILLAGES_PER_SESSION = 25
+
+# Function to set up the status queue, the log queue and the metrics queue of a pool worker
+def initialize_worker(status_events, log_queue, control_samples=None, active_limit=None, metrics_queue=None, log_level=LOG_LEVEL, plot_log_sample_rate=PLOT_LOG_SAMPLE_RATE):
+    set_status_queue(status_events)
+    setup_worker_logging(log_queue, log_level, plot_log_sample_rate)
+    set_concurrency_control(control_samples, active_limit)
+    set_metrics_queue(metrics_queue)
+
+# Script returning the [value, text] pairs of every option of a dropdown
+GET_SELECT_OPTIONS_SCRIPT = """
+    var select = document.getElementById(arguments[0]);
+    if (!select) {
+        return null;
+    }
+    return Array.prototype.map.call(select.options, function (option) {
+        return [option.value, option.text];
+    });
+"""
+
+# Script selecting an option by index, checking its value when one is given, and firing the change event.
+# It returns the text of the selected option, or null if the dropdown or the expected option is missing.
+SELECT_OPTION_BY_INDEX_SCRIPT = """
+    var select = document.getElementById(arguments[0]), index = arguments[1], expectedValue = arguments[2];
+    if (!select || index >= select.options.length || (expectedValue !== null && select.options[index].value !== expectedValue)) {
+        return null;
+    }
+    select.selectedIndex = index;
+    select.dispatchEvent(new Event('change', {bubbles: true}));
+    return select.options[index].text;
+"""
+
+# Script selecting an option by text and firing the change event.
+# It returns null if the dropdown is missing and false if no option has the text.
+SELECT_OPTION_BY_TEXT_SCRIPT = """
+    var select = document.getElementById(arguments[0]), text = arguments[1];
+    if (!select) {
+        return null;
+    }
+    for (var index = 0; index < select.options.length; index++) {
+        if (select.options[index].text === text) {
+            select.selectedIndex = index;
+            select.dispatchEvent(new Event('change', {bubbles: true}));
+            return true;
+        }
+    }
+    return false;
+"""
+
+# Function to read the (value, text) pairs of every option of a dropdown in one call
+def get_select_options(driver, select_element_id):
+    return [tuple(option) for option in driver.execute_script(GET_SELECT_OPTIONS_SCRIPT, select_element_id) or []]
+
+# Function to select an option by index in one call, returning its text or None if it is not there
+def select_option_by_index(driver, select_element_id, index, expected_value=None):
+    return driver.execute_script(SELECT_OPTION_BY_INDEX_SCRIPT, select_element_id, index, expected_value)
 
 # Function to select an option by text with retries
-def select_option_by_text_with_retry(driver, select_element_id, option_text, log_file, instance_id, progress_tracker, taluka_path, total_villages, current_taluka_name, current_taluka_index, retries=3):
+def select_option_by_text_with_retry(driver, select_element_id, option_text, log_file, instance_id, retries=3):
     for attempt in range(retries):
         try:
-            select_element = Select(driver.find_element(By.ID, select_element_id))
-            for option in select_element.options:
-                if option.text == option_text:
-                    option.click()
-                    return True
-            return False
-        except (StaleElementReferenceException, NoSuchElementException, ElementClickInterceptedException) as e:
+            selected = driver.execute_script(SELECT_OPTION_BY_TEXT_SCRIPT, select_element_id, option_text)
+            if selected is None:
+                raise NoSuchElementException(f"Dropdown '{select_element_id}' not found")
+            return selected
+        except (NoSuchElementException, JavascriptException) as e:
             message = f"Error selecting option '{option_text}' on attempt {attempt + 1}/{retries}: {e}"
             print_and_log_time(message, log_file)
-            progress_tracker[instance_id]['message'] = message
-            update_terminal_output(progress_tracker, taluka_path, total_villages, current_taluka_name, current_taluka_index)
-            time.sleep(1)
+            report_message(instance_id, message)
             if attempt < retries - 1:
-                # Re-locate the element without refreshing the page
-                select_element = WebDriverWait(driver, 20).until(
-                    EC.presence_of_element_located((By.ID, select_element_id))
-                )
+                # Wait for the element to be back without refreshing the page
+                wait_for_options(driver, select_element_id)
             else:
                 raise
     return False
 
-# Function to inject JavaScript for MutationObserver
-def inject_mutation_observer(driver):
-    script = """
-        if (window.plotInfoObserver) {
-            window.plotInfoObserver.disconnect();
-        }
-        window.plotInfoUpdated = false;
-        var targetNode = document.getElementById('plotinfo');
-        var observerOptions = {
-            childList: true,
-            subtree: true
-        };
-        function callback(mutationsList, observer) {
+# Script installing a MutationObserver that resolves a promise on the next plot info update
+PLOT_INFO_OBSERVER_SCRIPT = """
+    if (window.plotInfoObserver) {
+        window.plotInfoObserver.disconnect();
+    }
+    var targetNode = document.getElementById('plotinfo');
+    var observerOptions = {
+        childList: true,
+        subtree: true
+    };
+    window.plotInfoUpdated = new Promise(function (resolve) {
+        window.plotInfoObserver = new MutationObserver(function (mutationsList, observer) {
             for (var mutation of mutationsList) {
                 if (mutation.type === 'childList') {
-                    window.plotInfoUpdated = true;
+                    observer.disconnect();
+                    resolve(true);
+                    return;
                 }
             }
-        }
-        window.plotInfoObserver = new MutationObserver(callback);
+        });
         window.plotInfoObserver.observe(targetNode, observerOptions);
-    """
-    driver.execute_script(script)
+    });
+"""
 
-# Function to wait for plot info update using MutationObserver
-def wait_for_plot_info_update(driver, log_file, instance_id, progress_tracker, taluka_path, total_villages, current_taluka_name, current_taluka_index, previous_plot_info, retries=1):
+# Function to inject JavaScript for a MutationObserver resolving a promise on the next plot info update.
+# It must be injected before the plot is selected so that the update cannot be missed.
+def inject_mutation_observer(driver):
+    driver.execute_script(PLOT_INFO_OBSERVER_SCRIPT)
+
+# Function to watch #plotinfo and select a plot by index and value in a single call
+def select_plot_by_index(driver, plot_index, plot_value):
+    return driver.execute_script(PLOT_INFO_OBSERVER_SCRIPT + SELECT_OPTION_BY_INDEX_SCRIPT, 'surveyNumber', plot_index, plot_value)
+
+# Script returning the plot info text once the injected observer has seen an update, or null on timeout
+WAIT_FOR_PLOT_INFO_SCRIPT = """
+    var timeoutMs = arguments[0];
+    var done = arguments[arguments.length - 1];
+    var timer = setTimeout(function () { done(null); }, timeoutMs);
+    window.plotInfoUpdated.then(function () {
+        clearTimeout(timer);
+        done(document.getElementById('plotinfo').innerText);
+    });
+"""
+
+# Function to wait for the plot info update announced by the injected MutationObserver
+def wait_for_plot_info_update(driver, log_file, instance_id, previous_plot_info, retries=1):
     for attempt in range(retries):
         try:
-            inject_mutation_observer(driver)
-            WebDriverWait(driver, 20).until(
-                lambda d: d.execute_script("return window.plotInfoUpdated")
-            )
-            plot_info = driver.find_element(By.ID, 'plotinfo').text
+            plot_info = run_wait_script(driver, WAIT_FOR_PLOT_INFO_SCRIPT, 20)
+            if plot_info is None:
+                raise TimeoutException("Plot info not updated")
             return plot_info
         except TimeoutException:
             message = f"Timeout waiting for plot info update on attempt {attempt + 1}/{retries}"
             print_and_log_time(message, log_file)
-            progress_tracker[instance_id]['message'] = message
-            update_terminal_output(progress_tracker, taluka_path, total_villages, current_taluka_name, current_taluka_index)
+            report_message(instance_id, message)
             # Backup logic: compare with previous plot info
             try:
                 plot_info = driver.find_element(By.ID, 'plotinfo').text
@@ -104,26 +168,22 @@ def wait_for_plot_info_update(driver, log_file, instance_id, progress_tracker, t
             except NoSuchElementException:
                 pass
             if attempt < retries - 1:
-                time.sleep(1)
+                inject_mutation_observer(driver)
             else:
                 raise
 
 # Function to check if the yellow map is loaded
 def is_yellow_map_loaded(driver):
-    try:
-        # Check for the presence of the yellow map
-        map_element = WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.CLASS_NAME, 'ol-viewport'))
-        )
-        return True
-    except TimeoutException:
-        return False
+    # The map viewport is created by the page script before any tile is fetched, so this holds with tiles blocked
+    return wait_for_selector(driver, '.ol-viewport')
 
 def initialize_browser(webdriver_path, firefox_options, log_file, retries=3):
     for attempt in range(retries):
         try:
             service = Service(webdriver_path)
             driver = webdriver.Firefox(service=service, options=firefox_options)
+            # The waits share one script timeout per session, only raised by a longer wait
+            set_script_timeout(driver)
             return driver
         except Exception as e:
             message = f"Error initializing browser on attempt {attempt + 1}/{retries}: {e}"
@@ -132,194 +192,334 @@ def initialize_browser(webdriver_path, firefox_options, log_file, retries=3):
             if attempt == retries - 1:
                 raise
 
-def get_village_name_to_scrape(instance_id, villages, processed_villages, lock, taluka_path):
-    with lock:
-        for village_index, village_name in villages:
-            village_file_path = os.path.join(taluka_path, f'{village_name}.xlsx')
-            if village_file_path not in processed_villages:
-                processed_villages.append(village_file_path)
-                return village_index, village_name
-    return None, None
-
-def save_village_data(village_df, village_file_path, log_file, village_name):
+def save_village_data(plot_data, village_file_path, log_file, village_name):
     try:
-        with pd.ExcelWriter(village_file_path) as writer:
-            village_df.to_excel(writer, sheet_name=village_name, index=False)
+        write_village_workbook(plot_data, village_file_path, village_name)
         print_and_log_time(f"Village '{village_name}' data saved", log_file)
+        return True
     except Exception as e:
         print_and_log_time(f"Error saving data for village '{village_name}': {e}", log_file)
+        return False
 
-def scrape_village(instance_id, district_index, taluka_index, progress_tracker, lock, villages, processed_villages, total_villages, taluka_path, current_taluka_name, current_taluka_index):
-    # Setup Firefox options
-    firefox_options = Options()
-    firefox_options.binary_location = r"C:\Program Files\Mozilla Firefox\firefox.exe"  # Update this path if necessary
-    firefox_options.add_argument('--headless')
-
-    # Path to your Firefox WebDriver (geckodriver)
-    webdriver_path = "./geckodriver.exe"
-
-    while True:
-        village_index, village_name = get_village_name_to_scrape(instance_id, villages, processed_villages, lock, taluka_path)
-        if village_index is None:
-            break
+# Function to append the village records to the partitioned Parquet dataset
+def save_village_parquet_data(plot_data, district_name, taluka_name, log_file, village_name):
+    try:
+        save_village_parquet_frames(plot_data.iter_frames(), PARQUET_ROOT, district_name, taluka_name, village_name)
+        print_and_log_time(f"Village '{village_name}' data saved to the Parquet dataset", log_file)
+        return True
+    except Exception as e:
+        print_and_log_time(f"Error saving data for village '{village_name}': {e}", log_file)
+        return False
 
-        log_path = os.path.join('logs', f'district_{district_index}', f'taluka_{taluka_index}')
-        if not os.path.exists(log_path):
-            os.makedirs(log_path)
+# Function to upload the village records to the coordinator of a distributed crawl
+def upload_remote_village_data(coordinator_url, job_id, worker, plot_data, log_file, village_name):
+    try:
+        # The coordinator takes a village in one request, so only the upload holds its whole frame
+        village_df = plot_records_to_frame(record for batch in plot_data.iter_batches() for record in batch)
+        upload_village_results(coordinator_url, job_id, worker, village_df)
+        print_and_log_time(f"Village '{village_name}' data uploaded to the coordinator", log_file)
+        return True
+    except Exception as e:
+        print_and_log_time(f"Error uploading data for village '{village_name}': {e}", log_file)
+        return False
 
-        log_file = os.path.join(log_path, f'village_{village_index}.txt')
-        
-        driver = initialize_browser(webdriver_path, firefox_options, log_file)
-        village_start_time = datetime.now()
-        plot_data = []
+# Function to create the district and taluka output folders and return the taluka path
+def create_output_folders(district_name, taluka_name, log_file):
+    # Create a folder for the district if it doesn't exist
+    district_path = os.path.join(district_name)
+    if not os.path.exists(district_path):
+        os.makedirs(district_path)
+    print_and_log_time(f"District folder '{district_name}' created or already exists", log_file)
 
-        try:
+    # Create a folder for the taluka if it doesn't exist
+    taluka_path = os.path.join(district_path, taluka_name)
+    if not os.path.exists(taluka_path):
+        os.makedirs(taluka_path)
+    print_and_log_time(f"Taluka folder '{taluka_name}' created or already exists", log_file)
+    return taluka_path
+
+# Function to open the webpage and select the state, category, district and taluka, returning their names
+def select_taluka(driver, district_index, taluka_index, log_file, base_url=BASE_URL, page_loaded=False):
+    # A warm browser from the pool is already on the untouched webpage
+    if page_loaded:
+        print_and_log_time("Using the preloaded webpage", log_file)
+    else:
+        with stage_span('page_load'):
             # Open the webpage
-            driver.get("https://mahabhunakasha.mahabhumi.gov.in/27/index.html")
+            driver.get(base_url + "index.html")
             print_and_log_time("Opened the webpage", log_file)
 
             # Allow the page to load
-            WebDriverWait(driver, 3600).until(
-                EC.presence_of_element_located((By.ID, 'level_0'))
-            )
+            wait_for_element(driver, 'level_0', 3600)
             print_and_log_time("Page loaded", log_file)
 
-            # Select the first option in the state dropdown
-            state_select = Select(driver.find_element(By.ID, 'level_0'))
-            state_select.select_by_index(0)
-
-            # Wait for the category dropdown to be populated
-            WebDriverWait(driver, 20).until(
-                EC.presence_of_element_located((By.ID, 'level_1'))
-            )
-            time.sleep(5)  # Add a small delay to allow the dropdown to populate
-            category_select = Select(driver.find_element(By.ID, 'level_1'))
-            WebDriverWait(driver, 20).until(
-                lambda d: len(category_select.options) > 1
-            )
-            category_select.select_by_index(0)
-
-            # Wait for the district dropdown to be populated and select the specific district
-            WebDriverWait(driver, 20).until(
-                EC.presence_of_element_located((By.ID, 'level_2'))
-            )
-            district_select = Select(driver.find_element(By.ID, 'level_2'))
-            WebDriverWait(driver, 20).until(
-                lambda d: len(district_select.options) > 1
-            )
-            district_select.select_by_index(district_index)
-            district_name = district_select.options[district_index].text
-
-            # Create a folder for the district if it doesn't exist
-            district_path = os.path.join(district_name)
-            if not os.path.exists(district_path):
-                os.makedirs(district_path)
-            print_and_log_time(f"District folder '{district_name}' created or already exists", log_file)
-
-            # Select the specific taluka
-            taluka_select = Select(driver.find_element(By.ID, 'level_3'))
-            WebDriverWait(driver, 20).until(
-                lambda d: len(taluka_select.options) > 1
-            )
-            taluka_select.select_by_index(taluka_index)
-            taluka_name = taluka_select.options[taluka_index].text
-
-            # Create a folder for the taluka if it doesn't exist
-            taluka_path = os.path.join(district_path, taluka_name)
-            if not os.path.exists(taluka_path):
-                os.makedirs(taluka_path)
-            print_and_log_time(f"Taluka folder '{taluka_name}' created or already exists", log_file)
-
-            # Wait for the village dropdown to be populated
-            WebDriverWait(driver, 20).until(
-                EC.presence_of_element_located((By.ID, 'level_4'))
-            )
-            village_select = Select(driver.find_element(By.ID, 'level_4'))
-            WebDriverWait(driver, 20).until(
-                lambda d: len(village_select.options) > 1
-            )
-            if not select_option_by_text_with_retry(driver, 'level_4', village_name, log_file, instance_id, progress_tracker, taluka_path, total_villages, current_taluka_name, current_taluka_index):
-                print_and_log_time(f"Village '{village_name}' not found", log_file)
-                continue
+    with stage_span('dropdown_navigation'):
+        # Select the first option in the state dropdown
+        select_option_by_index(driver, 'level_0', 0)
 
-            # Check if the yellow map is loaded
-            if not is_yellow_map_loaded(driver):
-                print_and_log_time(f"Yellow map not loaded for village '{village_name}'. Skipping...", log_file)
-                continue
+        # Wait for the category dropdown to be populated
+        wait_for_options(driver, 'level_1', timeout=360)
+        select_option_by_index(driver, 'level_1', 0)
 
-            # Wait for the "Select Plot No:" dropdown to be visible and populated
-            plot_dropdown = WebDriverWait(driver, 20).until(
-                EC.presence_of_element_located((By.ID, 'surveyNumber'))
-            )
-
-            # Wait until the plot dropdown has options to select
-            WebDriverWait(driver, 20).until(lambda d: len(Select(d.find_element(By.ID, 'surveyNumber')).options) > 1)
-            plot_select = Select(driver.find_element(By.ID, 'surveyNumber'))
-
-            previous_plot_info = ""
-            # Iterate over each plot option by index
-            for plot_index in range(1, len(plot_select.options)):
-                plot_option_text = plot_select.options[plot_index].text
-                progress_tracker[instance_id] = {
-                    "district": district_name,
-                    "taluka": taluka_name,
-                    "village": village_name,
-                    "plot_index": plot_index,
-                    "plot_info": plot_option_text
-                }
-                update_terminal_output(progress_tracker, taluka_path, total_villages, current_taluka_name, current_taluka_index)
-                if not select_option_by_text_with_retry(driver, 'surveyNumber', plot_option_text, log_file, instance_id, progress_tracker, taluka_path, total_villages, current_taluka_name, current_taluka_index):  # Select the plot by text
-                    print_and_log_time(f"Plot option '{plot_option_text}' not found for village '{village_name}'", log_file)
-                    break
+        # Wait for the district dropdown to be populated and select the specific district
+        wait_for_options(driver, 'level_2')
+        district_name = select_option_by_index(driver, 'level_2', district_index)
 
-                # Wait for the plot information to be updated
-                try:
-                    plot_info_text = wait_for_plot_info_update(driver, log_file, instance_id, progress_tracker, taluka_path, total_villages, current_taluka_name, current_taluka_index, previous_plot_info)
-                except TimeoutException:
-                    print_and_log_time(f"Timeout waiting for plot info for village '{village_name}', option: {plot_option_text}", log_file)
-                    continue
+        # Select the specific taluka
+        wait_for_options(driver, 'level_3')
+        taluka_name = select_option_by_index(driver, 'level_3', taluka_index)
+    return district_name, taluka_name
+
+# Function to open the webpage and walk the state/category/district/taluka dropdowns
+def navigate_to_taluka(driver, district_index, taluka_index, log_file, base_url=BASE_URL, page_loaded=False):
+    district_name, taluka_name = select_taluka(driver, district_index, taluka_index, log_file, base_url, page_loaded)
+    taluka_path = create_output_folders(district_name, taluka_name, log_file)
+    return district_name, taluka_name, taluka_path
+
+# Function to select a village on an already navigated taluka and wait for its plots
+def select_village(driver, village_name, log_file, instance_id):
+    # Wait for the village dropdown to be populated
+    wait_for_options(driver, 'level_4')
+
+    # Remember a plot option of the previous village so we can tell when the dropdown is rebuilt
+    previous_plot_option = driver.execute_script("""
+        var select = document.getElementById('surveyNumber');
+        return select && select.options.length > 1 ? select.options[1] : null;
+    """)
+
+    with stage_span('map_load'):
+        if not select_option_by_text_with_retry(driver, 'level_4', village_name, log_file, instance_id):
+            print_and_log_time(f"Village '{village_name}' not found", log_file)
+            return None
+
+        # Check if the yellow map is loaded
+        if not is_yellow_map_loaded(driver):
+            print_and_log_time(f"Yellow map not loaded for village '{village_name}'. Skipping...", log_file)
+            return None
+
+        # Wait for the plots of the previous village to be replaced
+        if previous_plot_option is not None:
+            wait_for_detached(driver, previous_plot_option)
+
+        # Wait until the "Select Plot No:" dropdown has options to select, then read them all at once
+        wait_for_options(driver, 'surveyNumber')
+        return get_select_options(driver, 'surveyNumber')
+
+# Function to scrape the plots of the selected village in the browser into plot_data, skipping seen options
+def scrape_village_plots(driver, plot_options, district_name, taluka_name, village_name, plot_data, seen_options, on_records, log_file, instance_id):
+    plot_option_texts = [plot_option_text for _, plot_option_text in plot_options[1:]]
+    previous_plot_info = ""
+    # Iterate over each plot option by index
+    for plot_index in range(1, len(plot_options)):
+        plot_value, plot_option_text = plot_options[plot_index]
+        if plot_option_text in seen_options:
+            continue
+        report_plot(instance_id, {
+            "district": district_name,
+            "taluka": taluka_name,
+            "village": village_name,
+            "village_english": transliterate_name(village_name.split(' ', 1)[-1]),
+            "plot_index": plot_index,
+            "plot_info": plot_option_text
+        })
+        # Watch #plotinfo and select the plot in one call so the update cannot be missed
+        plot_start_time = time.time()
+        with stage_span('option_select'):
+            selected = select_plot_by_index(driver, plot_index, plot_value)
+        if selected is None:
+            print_and_log_time(f"Plot option '{plot_option_text}' not found for village '{village_name}'", log_file)
+            break
+
+        # Wait for the plot information to be updated
+        try:
+            with stage_span('plotinfo_wait'):
+                plot_info_text = wait_for_plot_info_update(driver, log_file, instance_id, previous_plot_info)
+        except TimeoutException:
+            print_and_log_time(f"Timeout waiting for plot info for village '{village_name}', option: {plot_option_text}", log_file)
+            report_plot_timeout()
+            continue
+
+        report_plot_latency(time.time() - plot_start_time)
+        previous_plot_info = plot_info_text
 
-                previous_plot_info = plot_info_text
+        # Group lines into sets of information for each survey number
+        with stage_span('parse'):
+            plot_records = parse_plot_info_text(plot_info_text)
 
-                # Split the plot information into lines
-                plot_info_lines = plot_info_text.split('\n')
+        # Log the current plot info
+        if plot_records:
+            print_and_log_time(f"Plot info: {plot_records[-1]}", log_file, PLOT_INFO)
+            plot_data.extend(plot_records)
+        on_records(plot_index, plot_option_text, plot_records)
 
-                # Group lines into sets of information for each survey number
-                current_plot_info = {}
-                for line in plot_info_lines:
-                    if line.startswith('Survey No.'):
-                        if current_plot_info:
-                            plot_data.append(current_plot_info)
-                        current_plot_info = {'Survey No.': line.split(': ')[1]}
-                    elif line.startswith('Total Area'):
-                        current_plot_info['Total Area'] = line.split(': ')[1]
-                    elif line.startswith('Pot kharaba'):
-                        current_plot_info['Pot kharaba'] = line.split(': ')[1]
-                    elif line.startswith('Owner Name'):
-                        current_plot_info['Owner Name'] = line.split(': ')[1]
-                    elif line.startswith('Khata No.'):
-                        current_plot_info['Khata No.'] = line.split(': ')[1]
+    return plot_option_texts
 
-                # Log the current plot info
-                if current_plot_info:
-                    print_and_log_time(f"Plot info: {current_plot_info}", log_file)
-                    plot_data.append(current_plot_info)
+def scrape_village(instance_id, db_path, index_file=HIERARCHY_INDEX_FILE, max_villages_per_session=MAX_VILLAGES_PER_SESSION, engine='selenium', plot_concurrency=1, output_format='xlsx', coordinator_url=None, lean_browser=False, base_url=BASE_URL, standby_browsers=STANDBY_BROWSERS, plot_buffer_records=PLOT_BUFFER_RECORDS, plot_rate=PLOT_RATE):
+    # Setup Firefox options, the lean profile skips the map tiles, images, fonts and stylesheets
+    firefox_options = create_firefox_options(lean_browser)
 
-            # Create a DataFrame for the village
-            village_df = pd.DataFrame(plot_data)
+    # Path to your Firefox WebDriver (geckodriver)
+    webdriver_path = "./geckodriver.exe"
+
+    # The browser session is kept on the selected taluka across villages
+    driver = None
+    session_taluka = None
+    villages_in_session = 0
+
+    # Warm standby browsers replace a crashed or recycled session without a cold start, created with the first session
+    browser_pool = None
+    page_loaded = False
+
+    # District and taluka names of the claimed jobs come from the hierarchy index
+    if coordinator_url:
+        hierarchy = fetch_remote_hierarchy(coordinator_url)
+    else:
+        hierarchy = load_hierarchy_index(index_file, ttl_seconds=None)
+
+    # The http engine shares one pooled session across all villages of this worker
+    http_session = create_http_session() if engine == 'http' else None
+
+    # Villages are claimed under a lease from the shared crawl database or from a remote coordinator
+    conn = None if coordinator_url else open_crawl_db(db_path)
+    worker = f"{socket.gethostname()}-{os.getpid()}-{instance_id}"
+
+    while True:
+        # Instances above the limit of the concurrency controller wait without holding a browser
+        if driver is not None and is_above_worker_limit(instance_id):
+            browser_pool.release(driver)
+            browser_pool.pause()
+            driver = None
+        if wait_for_worker_slot(instance_id):
+            print_and_log_time(f"Instance {instance_id} resumed by the concurrency controller", None)
+
+        # Villages of the taluka the session is on come first, a claim in another taluka costs a page load and the dropdown walk
+        job = None
+        if driver is not None and session_taluka is not None:
+            job, lease_seconds = claim_next_village(conn, coordinator_url, worker, *session_taluka)
+        if job is None:
+            job, lease_seconds = claim_next_village(conn, coordinator_url, worker)
+        if job is None:
+            break
+        job_id, district_index, taluka_index, village_index, village_name = job
+        village_done = False
+        village_error = None
+        plot_count = None
+
+        # Keep the lease alive while the village is scraped, however many plots it has
+        heartbeat = start_heartbeat(coordinator_url, job_id, worker, lease_seconds) if coordinator_url else start_lease_heartbeat(db_path, job_id, worker)
+
+        _, district_name, taluka_name = get_taluka_villages(hierarchy, district_index, taluka_index)
+        taluka_path = os.path.join(district_name, taluka_name)
+
+        # Records of the village are tagged with the name of its old per-village log
+        log_file = os.path.join('logs', f'district_{district_index}', f'taluka_{taluka_index}', f'village_{village_index}.txt')
+
+        # Recycle the session after a fixed number of villages, or once it is too old or uses too much memory
+        if driver is not None:
+            recycle_reason = f"{villages_in_session} villages" if villages_in_session >= max_villages_per_session else browser_pool.needs_recycle(driver)
+            if recycle_reason:
+                print_and_log_time(f"Recycling browser session: {recycle_reason}", log_file)
+                browser_pool.release(driver, log_file)
+                driver = None
+
+        village_start_time = datetime.now()
+
+        # Unique records are buffered in memory up to a bound and spilled to a segment next to the checkpoint beyond it
+        checkpoint_path = get_checkpoint_path(taluka_path, village_name)
+        plot_data = PlotBuffer(get_segment_path(checkpoint_path), plot_buffer_records)
+
+        # Resume from the plots checkpointed by an earlier attempt at this village
+        seen_options, plot_data = load_plot_checkpoint(checkpoint_path, plot_data)
+        if seen_options:
+            print_and_log_time(f"Resuming village '{village_name}' after {len(seen_options)} checkpointed plots", log_file)
+        resumed_plots = len(seen_options)
+        checkpoint_file = open_plot_checkpoint(checkpoint_path)
+
+        # Checkpoint every plot as soon as it is parsed
+        def on_records(plot_index, plot_option_text, plot_records):
+            append_plot_checkpoint(checkpoint_file, plot_index, plot_option_text, plot_records)
+            seen_options.add(plot_option_text)
+
+        try:
+            # A failed cold start releases the village like any other error instead of ending the worker
+            if engine == 'selenium' and driver is None:
+                if browser_pool is None:
+                    browser_pool = BrowserPool(lambda: initialize_browser(webdriver_path, firefox_options, None), base_url + "index.html", standby_browsers)
+                with stage_span('browser_init'):
+                    driver = browser_pool.acquire()
+                session_taluka = None
+                villages_in_session = 0
+                page_loaded = True
+
+            if engine == 'http':
+                # Report progress per plot like the browser engine does
+                def on_plot(plot_index, plot_option_text):
+                    report_plot(instance_id, {
+                        "district": district_name,
+                        "taluka": taluka_name,
+                        "village": village_name,
+                        "village_english": transliterate_name(village_name.split(' ', 1)[-1]),
+                        "plot_index": plot_index,
+                        "plot_info": plot_option_text
+                    })
+
+                district_name, taluka_name, plot_option_texts = scrape_village_http(http_session, district_index, taluka_index, village_name, plot_data, lambda message, level=logging.INFO: print_and_log_time(message, log_file, level), base_url=base_url, on_plot=on_plot, concurrency=plot_concurrency, seen_options=seen_options, on_records=on_records, district_name=district_name, taluka_name=taluka_name, village_code=get_village_code(hierarchy, district_index, taluka_index, village_name), rate=plot_rate)
+                taluka_path = create_output_folders(district_name, taluka_name, log_file)
+                if plot_option_texts is None:
+                    village_error = "village not found"
+                    continue
+            else:
+                # The session only walks the dropdowns again when the village is in another taluka
+                if session_taluka != (district_index, taluka_index):
+                    district_name, taluka_name, taluka_path = navigate_to_taluka(driver, district_index, taluka_index, log_file, base_url, page_loaded)
+                    session_taluka = (district_index, taluka_index)
+                    page_loaded = False
+                else:
+                    print_and_log_time(f"Reusing browser session on taluka '{taluka_name}'", log_file)
+                villages_in_session += 1
+
+                plot_options = select_village(driver, village_name, log_file, instance_id)
+                if plot_options is None:
+                    continue
+
+                plot_option_texts = scrape_village_plots(driver, plot_options, district_name, taluka_name, village_name, plot_data, seen_options, on_records, log_file, instance_id)
 
-            # Check for duplicates and remove them
-            village_df.drop_duplicates(inplace=True)
+            plot_count = len(plot_option_texts)
+            if conn is not None:
+                record_plot_count(conn, job_id, plot_count)
 
-            # Save the current state of the Excel file
-            village_file_path = os.path.join(taluka_path, f'{village_name}.xlsx')
-            print_and_log_time("Saving the xl file",log_file)
-            save_village_data(village_df, village_file_path, log_file, village_name)
+            # Only a village whose every plot option has been seen is complete
+            missing_options = set(plot_option_texts) - seen_options
+            if missing_options:
+                village_error = f"{len(missing_options)} of {len(plot_option_texts)} plots not scraped"
+                print_and_log_time(f"Village '{village_name}' incomplete: {village_error}", log_file)
+                continue
 
+            # A worker whose lease expired must not overwrite the village another worker now owns
+            if conn is not None and not renew_lease(conn, job_id, worker):
+                village_error = "lease lost"
+                print_and_log_time(f"Lease of village '{village_name}' lost to another worker, not saving it", log_file)
+                continue
 
-            # Update processed_villages to include the saved village
-            with lock:
-                processed_villages.append(village_file_path)
+            # Duplicates were dropped as the records arrived
+            if plot_data.duplicate_records:
+                print_and_log_time(f"Dropped {plot_data.duplicate_records} duplicate records of village '{village_name}'", log_file)
+
+            # Upload the village to the coordinator, or save it to the Parquet dataset or its own Excel file
+            with stage_span('save'):
+                if coordinator_url:
+                    saved = upload_remote_village_data(coordinator_url, job_id, worker, plot_data, log_file, village_name)
+                elif output_format == 'parquet':
+                    saved = save_village_parquet_data(plot_data, district_name, taluka_name, log_file, village_name)
+                else:
+                    village_file_path = os.path.join(taluka_path, f'{village_name}.xlsx')
+                    print_and_log_time("Saving the xl file",log_file)
+                    saved = save_village_data(plot_data, village_file_path, log_file, village_name)
+            if not saved:
+                village_error = "saving failed"
+                continue
+            remove_plot_checkpoint(checkpoint_path)
+            village_done = True
 
             # Print time taken for the village
             print_and_log_time(f"Village '{village_name}' processed", log_file)
@@ -327,131 +527,234 @@ def scrape_village(instance_id, district_index, taluka_index, progress_tracker,
 
         except Exception as e:
             print_and_log_time(f"Error encountered: {e}", log_file)
-            # Save data if there is any error during processing
-            if plot_data:
-                village_df = pd.DataFrame(plot_data)
-                village_file_path = os.path.join(taluka_path, f'{village_name}.xlsx')
-                save_village_data(village_df, village_file_path, log_file, village_name)
+            village_error = str(e)
+            # Rebuild the browser session for the next village
+            if driver is not None:
+                report_browser_crash()
+                browser_pool.release(driver, log_file)
+                driver = None
 
         finally:
-            # Close the browser
-            driver.quit()
-
-            # Save data in the finally block as well
-            if plot_data:
-                print_and_log_time("lolllllllllllllllllllllllllllllllllllllllllllllllllllllllllllllllllllllllllllllllll",log_file)
-                village_df = pd.DataFrame(plot_data)
-                village_file_path = os.path.join(taluka_path, f'{village_name}.xlsx')
-                save_village_data(village_df, village_file_path, log_file, village_name)
+            # Scraped plots stay in the checkpoint until the village is complete, the segment is rebuilt from it
+            checkpoint_file.close()
+            plot_data.close()
+            if not village_done and plot_data:
+                print_and_log_time(f"Village '{village_name}' checkpointed with {len(seen_options)} plots", log_file)
+
+            # Record the outcome of the village in the crawl database or on the coordinator
+            heartbeat.set()
+            progressed = len(seen_options) > resumed_plots
+            if coordinator_url:
+                try:
+                    if village_done:
+                        complete_remote_job(coordinator_url, job_id, worker, plot_count)
+                    else:
+                        release_remote_job(coordinator_url, job_id, worker, village_error, plot_count, progressed)
+                except requests.RequestException as e:
+                    # The coordinator requeues the village once its lease expires
+                    print_and_log_time(f"Error reporting village '{village_name}' to the coordinator: {e}", log_file)
             else:
-                print_and_log_time("plot data is empty",log_file)
+                owned = complete_job(conn, job_id, worker) if village_done else release_job(conn, job_id, worker, village_error, progressed=progressed)
+                if not owned:
+                    print_and_log_time(f"Lease of village '{village_name}' held by another worker, its state is left to that worker", log_file)
 
-        # Remove the instance from the progress tracker if it exists
-        if instance_id in progress_tracker:
-            progress_tracker.pop(instance_id)
-        update_terminal_output(progress_tracker, taluka_path, total_villages, current_taluka_name, current_taluka_index)
+        # Update the dashboard and mark the instance as idle until it claims another village
+        if village_done:
+            report_village_done(instance_id, village_name)
+        report_instance_idle(instance_id)
 
         # Print overall time taken
         print_and_log_time(f"Script completed for village '{village_name}'", log_file)
 
-def get_villages(district_index, taluka_index):
-    # Setup Firefox options
-    firefox_options = Options()
-    firefox_options.binary_location = r"C:\Program Files\Mozilla Firefox\firefox.exe"  # Update this path if necessary
-    firefox_options.add_argument('--headless')
+    # Close the browser once there are no more villages to scrape
+    if driver is not None:
+        browser_pool.release(driver, log_file)
+    if browser_pool is not None:
+        browser_pool.close()
+    if http_session is not None:
+        http_session.close()
+        if plot_concurrency > 1:
+            from async_plot_fetcher import close_plot_fetcher
+            close_plot_fetcher()
+    if conn is not None:
+        conn.close()
+    save_transliteration_cache()
+
+    # Send the stage timings this worker has not reported yet
+    flush_stage_metrics()
+
+    # Lines of the #plotinfo panel the parser did not recognise, by label
+    if unknown_line_counts:
+        print_and_log_time(f"Unknown plot info lines of instance {instance_id}: {dict(unknown_line_counts)}", None, logging.WARNING)
+
+# Function to select an option and wait for the dependent dropdown to be rebuilt and populated
+def select_option_and_wait_for_dependent(driver, select_element_id, index, dependent_element_id):
+    previous_option = driver.execute_script("""
+        var select = document.getElementById(arguments[0]);
+        return select && select.options.length > 1 ? select.options[1] : null;
+    """, dependent_element_id)
+    name = select_option_by_index(driver, select_element_id, index)
+    if previous_option is not None:
+        wait_for_detached(driver, previous_option)
+    wait_for_options(driver, dependent_element_id)
+    return name
+
+# Function to crawl the whole district -> taluka -> village tree in one browser session
+def discover_hierarchy(log_file='logs/log_village_discovery.txt', lean_browser=False, base_url=BASE_URL):
+    # Setup Firefox options, the lean profile skips the map tiles, images, fonts and stylesheets
+    firefox_options = create_firefox_options(lean_browser)
 
     # Path to your Firefox WebDriver (geckodriver)
     webdriver_path = "./geckodriver.exe"
 
-    driver = initialize_browser(webdriver_path, firefox_options, 'logs/log_village_discovery.txt')
+    driver = initialize_browser(webdriver_path, firefox_options, log_file)
     try:
-        # Open the webpage
-        driver.get("https://mahabhunakasha.mahabhumi.gov.in/27/index.html")
-        WebDriverWait(driver, 3600).until(
-            EC.presence_of_element_located((By.ID, 'level_0'))
-        )
-
-        # Select the first option in the state dropdown
-        state_select = Select(driver.find_element(By.ID, 'level_0'))
-        state_select.select_by_index(0)
-
-        # Wait for the category dropdown to be populated
-        WebDriverWait(driver, 360).until(
-            EC.presence_of_element_located((By.ID, 'level_1'))
-        )
-        time.sleep(5)  # Add a small delay to allow the dropdown to populate
-        category_select = Select(driver.find_element(By.ID, 'level_1'))
-        WebDriverWait(driver, 20).until(
-            lambda d: len(category_select.options) > 1
-        )
-        category_select.select_by_index(0)
-
-        # Wait for the district dropdown to be populated and select the specific district
-        WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.ID, 'level_2'))
-        )
-        district_select = Select(driver.find_element(By.ID, 'level_2'))
-        WebDriverWait(driver, 20).until(
-            lambda d: len(district_select.options) > 1
-        )
-        district_select.select_by_index(district_index)
-        district_name = district_select.options[district_index].text
-
-        # Select the specific taluka
-        WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.ID, 'level_3'))
-        )
-        taluka_select = Select(driver.find_element(By.ID, 'level_3'))
-        WebDriverWait(driver, 20).until(
-            lambda d: len(taluka_select.options) > 1
-        )
-        taluka_select.select_by_index(taluka_index)
-        taluka_name = taluka_select.options[taluka_index].text
-
-        # Wait for the village dropdown to be populated
-        WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.ID, 'level_4'))
-        )
-        village_select = Select(driver.find_element(By.ID, 'level_4'))
-        WebDriverWait(driver, 20).until(
-            lambda d: len(village_select.options) > 1
-        )
-        village_options = [(index, option.text) for index, option in enumerate(village_select.options[1:], start=1)]
-        return village_options, district_name, taluka_name
+        driver.get(base_url + "index.html")
+        wait_for_element(driver, 'level_0', 3600)
+        select_option_by_index(driver, 'level_0', 0)
+        wait_for_options(driver, 'level_1', timeout=360)
+        select_option_by_index(driver, 'level_1', 0)
+        wait_for_options(driver, 'level_2')
+
+        # Index 0 of the district, taluka and village dropdowns is a placeholder
+        districts = []
+        for district_index, (district_code, district_name) in enumerate(get_select_options(driver, 'level_2')[1:], start=1):
+            select_option_and_wait_for_dependent(driver, 'level_2', district_index, 'level_3')
+            talukas = []
+            for taluka_index, (taluka_code, taluka_name) in enumerate(get_select_options(driver, 'level_3')[1:], start=1):
+                select_option_and_wait_for_dependent(driver, 'level_3', taluka_index, 'level_4')
+                villages = [
+                    make_node(village_index, village_code, village_name)
+                    for village_index, (village_code, village_name) in enumerate(get_select_options(driver, 'level_4')[1:], start=1)
+                ]
+                talukas.append(make_node(taluka_index, taluka_code, taluka_name, "villages", villages))
+                print_and_log_time(f"Discovered {len(villages)} villages in taluka '{taluka_name}'", log_file)
+            districts.append(make_node(district_index, district_code, district_name, "talukas", talukas))
+        return districts
 
     finally:
         driver.quit()
 
+# Function to load the hierarchy index, crawling the site again if it is missing or stale.
+# The http engine crawls it over the REST endpoints so it never needs a browser.
+def load_or_discover_hierarchy(index_file=HIERARCHY_INDEX_FILE, lean_browser=False, base_url=BASE_URL, engine='selenium'):
+    hierarchy = load_hierarchy_index(index_file)
+    if hierarchy is None:
+        if engine == 'http':
+            districts = crawl_hierarchy_http(create_http_session(), base_url)
+        else:
+            districts = discover_hierarchy(lean_browser=lean_browser, base_url=base_url)
+        hierarchy = save_hierarchy_index(districts, index_file)
+    return hierarchy
+
+# Function to claim a village from the coordinator or the local crawl database, returning the job and the seconds of its lease
+def claim_next_village(conn, coordinator_url, worker, district_index=None, taluka_index=None):
+    if coordinator_url:
+        return claim_remote_village(coordinator_url, worker, district_index, taluka_index)
+    return claim_village(conn, worker, district_index, taluka_index), LEASE_SECONDS
+
 def get_already_processed_villages(taluka_path):
     if not os.path.exists(taluka_path):
         return []
     processed_villages = [os.path.join(taluka_path, file) for file in os.listdir(taluka_path) if file.endswith('.xlsx')]
     return processed_villages
 
-if __name__ == "__main__":
-    from multiprocessing import freeze_support
-    freeze_support()
-
-    manager = multiprocessing.Manager()
-    progress_tracker = manager.dict()
-    lock = manager.Lock()
+# Function to queue the villages of the selected talukas in one global job table
+def queue_local_villages(db_path, index_file, district_indices, taluka_indices=None, lean_browser=False, base_url=BASE_URL, engine='selenium'):
+    conn = open_crawl_db(db_path)
+
+    # Villages left in flight by a crashed run resume from their checkpoints instead of waiting for their leases to expire
+    reset_jobs = reset_in_flight_jobs(conn)
+    if reset_jobs:
+        print_and_log_time(f"Requeued {reset_jobs} villages left in flight by an earlier run", None, logging.WARNING)
+
+    # Villages failed by an earlier run, e.g. during a site outage, get a fresh set of attempts
+    reset_jobs = reset_failed_jobs(conn)
+    if reset_jobs:
+        print_and_log_time(f"Requeued {reset_jobs} villages failed by an earlier run", None, logging.WARNING)
+
+    hierarchy = load_or_discover_hierarchy(index_file, lean_browser, base_url, engine)
+    for district_index in district_indices:
+        district = get_district(hierarchy, district_index)
+        for taluka in district["talukas"]:
+            if taluka_indices and taluka["index"] not in taluka_indices:
+                continue
+            villages, district_name, taluka_name = get_taluka_villages(hierarchy, district_index, taluka["index"])
+            taluka_path = os.path.join(district_name, taluka_name)
 
-    district_index = 5  # Adjust this to the desired district index
-    taluka_indices = [6]  # List of taluka indices
+            # Mark the villages with an output file as done
+            enqueue_villages(conn, district_index, taluka["index"], villages)
+            mark_villages_done(conn, district_index, taluka["index"], [
+                os.path.splitext(os.path.basename(file_path))[0] for file_path in get_already_processed_villages(taluka_path)
+            ] + get_parquet_villages(PARQUET_ROOT, district_name, taluka_name))
 
-    for current_taluka_index in taluka_indices:
-        villages, district_name, current_taluka_name = get_villages(district_index, current_taluka_index)
-        villages = [villages[54]]
-        total_villages = len(villages)
-        print(villages)
+            # Villages never counted are scheduled by the plots in their checkpoints until a run records their plot count
+            seed_priorities(conn, district_index, taluka["index"], count_checkpoint_plots(taluka_path))
 
-        taluka_path = os.path.join(district_name, current_taluka_name)
-        processed_villages = manager.list(get_already_processed_villages(taluka_path))
+    # Jobs are claimed largest first using the plot counts recorded by earlier runs
+    job_counts = count_jobs(conn)
+    conn.close()
+    return job_counts
 
-        num_instances = 6  # Number of instances to run in parallel
+if __name__ == "__main__":
+    from multiprocessing import freeze_support
+    freeze_support()
 
-        with multiprocessing.Pool(processes=num_instances) as pool:
-            pool.starmap(scrape_village, [
-                (instance_id, district_index, current_taluka_index, progress_tracker, lock, villages, processed_villages, total_villages, taluka_path, current_taluka_name, current_taluka_index)
-                for instance_id in range(num_instances)
-            ])
+    parser = argparse.ArgumentParser(description="Scrape plot owner data of Maharashtra villages")
+    parser.add_argument("--districts", type=int, nargs='+', default=[5], help="Dropdown indices of the districts to scrape")
+    parser.add_argument("--talukas", type=int, nargs='+', help="Dropdown indices of the talukas to scrape, all talukas of the districts by default")
+    parser.add_argument("--workers", type=int, default=6, help="Maximum number of instances to run in parallel")
+    parser.add_argument("--min-workers", type=int, default=1, help="Fewest instances the concurrency controller scales down to")
+    parser.add_argument("--fixed-workers", action='store_true', help="Keep every instance active instead of adapting to the server")
+    parser.add_argument("--engine", choices=['selenium', 'http'], default='selenium', help="Extraction engine")
+    parser.add_argument("--plot-concurrency", type=int, default=8, help="Survey numbers fetched at once by the http engine")
+    parser.add_argument("--plot-rate", type=float, default=PLOT_RATE, help="Plot info requests per second the http engine sends to the site, split across the instances")
+    parser.add_argument("--output-format", choices=['xlsx', 'parquet'], default='xlsx', help="Village output: xlsx files or the Parquet dataset")
+    parser.add_argument("--max-villages-per-session", type=int, default=MAX_VILLAGES_PER_SESSION, help="Villages scraped before a browser session is rebuilt")
+    parser.add_argument("--db", default=CRAWL_DB_PATH, help="Path of the crawl state database")
+    parser.add_argument("--hierarchy-index", default=HIERARCHY_INDEX_FILE, help="Path of the hierarchy index")
+    parser.add_argument("--base-url", default=BASE_URL, help="Site to scrape, such as a local mock_site.py server")
+    parser.add_argument("--lean-browser", action='store_true', help="Block map tiles, images, fonts and stylesheets in the browser")
+    parser.add_argument("--plot-buffer-records", type=int, default=PLOT_BUFFER_RECORDS, help="Unique records of a village kept in memory before they are spilled to disk")
+    parser.add_argument("--standby-browsers", type=int, default=STANDBY_BROWSERS, help="Warm browsers each instance keeps on the start page besides its own, each one a further Firefox process")
+    parser.add_argument("--coordinator", help="URL of a coordinator to claim villages from instead of the local crawl database")
+    parser.add_argument("--metrics-port", type=int, default=None, help=f"Local port of the opt-in Prometheus stage metrics endpoint, e.g. {METRICS_PORT}, without it only the JSON snapshots are written")
+    parser.add_argument("--log-level", choices=['DEBUG', 'PLOT', 'INFO', 'WARNING', 'ERROR'], default=logging.getLevelName(LOG_LEVEL), help="Lowest level written to the log, DEBUG writes every per-plot line")
+    parser.add_argument("--plot-log-sample-rate", type=float, default=PLOT_LOG_SAMPLE_RATE, help="Share of the per-plot lines logged at INFO")
+    args = parser.parse_args()
+    log_level = logging.getLevelName(args.log_level)
+
+    # A single writer thread in this process writes the logs of every worker
+    log_listener, log_queue = start_log_listener(level=log_level, plot_sample_rate=args.plot_log_sample_rate)
+
+    # The dashboard process redraws the progress of every instance at a fixed rate
+    dashboard_process, status_events = start_status_dashboard()
+
+    # Stage timings of every worker are summed in this process, served to Prometheus and written as JSON snapshots
+    metrics_thread, metrics_stop, metrics_server, metrics_queue = start_metrics_collector(args.metrics_port)
+
+    # A coordinator owns the job queue of a distributed crawl, otherwise the villages are queued locally
+    if args.coordinator:
+        job_counts = fetch_remote_status(args.coordinator)
+    else:
+        job_counts = queue_local_villages(args.db, args.hierarchy_index, args.districts, args.talukas, args.lean_browser, args.base_url, args.engine)
+    report_scope(f"Districts {', '.join(map(str, args.districts))}", sum(job_counts.values()), job_counts.get(DONE, 0))
+
+    # The controller scales the active instances up while the server keeps up and halves them when it slows down
+    control_samples = active_limit = None
+    if not args.fixed_workers:
+        initial_workers = max(args.min_workers, args.workers // 2)
+        controller_thread, controller_stop, control_samples, active_limit = start_concurrency_controller(initial_workers, args.min_workers, args.workers)
+
+    # One long-lived pool drains the global queue, so no taluka boundary waits for its slowest village
+    with multiprocessing.Pool(processes=args.workers, initializer=initialize_worker, initargs=(status_events, log_queue, control_samples, active_limit, metrics_queue, log_level, args.plot_log_sample_rate)) as pool:
+        pool.starmap(scrape_village, [
+            (instance_id, args.db, args.hierarchy_index, args.max_villages_per_session, args.engine, args.plot_concurrency, args.output_format, args.coordinator, args.lean_browser, args.base_url, args.standby_browsers, args.plot_buffer_records, args.plot_rate / args.workers)
+            for instance_id in range(args.workers)
+        ])
+
+    if not args.fixed_workers:
+        stop_concurrency_controller(controller_thread, controller_stop)
+    stop_metrics_collector(metrics_thread, metrics_stop, metrics_server)
+    stop_status_dashboard(dashboard_process, status_events)
+    stop_log_listener(log_listener)
@@ -0,0 +1,92 @@
+import os
+import gzip
+import json
+import random
+import shutil
+import logging
+import multiprocessing
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+# JSON-lines log written by the single writer thread of the main process
+LOG_FILE = os.path.join('logs', 'scrape.jsonl')
+
+# Size at which the log is rotated and number of compressed logs kept
+LOG_MAX_BYTES = 50 * 1024 * 1024
+LOG_BACKUP_COUNT = 20
+
+# Default lowest level sent from the workers to the writer, DEBUG logs every per-plot line
+LOG_LEVEL = logging.INFO
+
+# Level of the per-plot "Plot info" lines and the default share of them logged at INFO
+PLOT_INFO = 15
+PLOT_LOG_SAMPLE_RATE = 0.01
+logging.addLevelName(PLOT_INFO, 'PLOT')
+
+logger = logging.getLogger('scraper')
+
+# Share of the per-plot lines logged at INFO in the current process
+plot_log_sample_rate = PLOT_LOG_SAMPLE_RATE
+
+# Formatter writing one JSON object per record
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%d %H:%M:%S'),
+            'level': record.levelname,
+            'process': record.processName,
+            'message': record.getMessage(),
+        }
+        if getattr(record, 'log_file', None):
+            entry['log_file'] = record.log_file
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+# Function to name rotated logs as gzip files
+def gzip_namer(name):
+    return name + '.gz'
+
+# Function to compress a rotated log
+def gzip_rotator(source, destination):
+    with open(source, 'rb') as source_file, gzip.open(destination, 'wb') as destination_file:
+        shutil.copyfileobj(source_file, destination_file)
+    os.remove(source)
+
+# Function to start the writer thread of the main process and return its listener and queue
+def start_log_listener(log_file=LOG_FILE, max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT, level=LOG_LEVEL, plot_sample_rate=PLOT_LOG_SAMPLE_RATE):
+    os.makedirs(os.path.dirname(log_file), exist_ok=True)
+    file_handler = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+    file_handler.namer = gzip_namer
+    file_handler.rotator = gzip_rotator
+    file_handler.setFormatter(JsonLinesFormatter())
+
+    # Warnings and errors still show up on the console
+    console_handler = logging.StreamHandler()
+    console_handler.setLevel(logging.WARNING)
+    console_handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s'))
+
+    log_queue = multiprocessing.Queue(-1)
+    listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    listener.start()
+    setup_worker_logging(log_queue, level, plot_sample_rate)
+    return listener, log_queue
+
+# Function to send the records of the current process to the writer, used as a pool initializer
+def setup_worker_logging(log_queue, level=LOG_LEVEL, plot_sample_rate=PLOT_LOG_SAMPLE_RATE):
+    global plot_log_sample_rate
+    plot_log_sample_rate = plot_sample_rate
+    logger.handlers = [QueueHandler(log_queue)]
+    logger.setLevel(level)
+    logger.propagate = False
+
+# Function to flush and stop the writer thread
+def stop_log_listener(listener):
+    listener.stop()
+
+# Function to log a message of a village, tagged with the per-village log name it used to go to
+def print_and_log_time(message, log_file, level=logging.INFO):
+    if level == PLOT_INFO:
+        # Only a sample of the per-plot lines is kept unless debug logging is on
+        level = logging.INFO if random.random() < plot_log_sample_rate else logging.DEBUG
+    if logger.isEnabledFor(level):
+        logger.log(level, message, extra={'log_file': log_file})
@@ -0,0 +1,260 @@
+import os
+import json
+import time
+import queue
+import logging
+import argparse
+import threading
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from event_queue import create_event_queue, send_event_nowait
+from scrape_logging import print_and_log_time
+
+# Stages of the scraper hot path, in the order a village goes through them
+STAGES = ('browser_init', 'page_load', 'dropdown_navigation', 'map_load', 'option_select', 'rate_limit_wait', 'plotinfo_wait', 'parse', 'save')
+
+# Upper bounds in seconds of the stage duration histogram buckets, the last bucket is +Inf
+HISTOGRAM_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+# Seconds a worker accumulates stage timings before sending them to the collector
+FLUSH_INTERVAL = 5.0
+
+# Maximum number of batches waiting for the collector
+METRICS_QUEUE_SIZE = 10000
+
+# Suggested port of the opt-in Prometheus endpoint, and the JSON snapshot written at a fixed interval
+METRICS_PORT = 9108
+METRICS_SNAPSHOT_FILE = os.path.join('logs', 'stage_metrics.json')
+SNAPSHOT_INTERVAL = 30.0
+
+# Queue of the collector, and the timings this process has not sent yet
+metrics_queue = None
+pending_stats = {}
+last_flush_time = time.monotonic()
+
+# Function to set the collector queue of the current process, used as a pool initializer
+def set_metrics_queue(new_metrics_queue):
+    global metrics_queue
+    metrics_queue = new_metrics_queue
+
+# Function to create the empty statistics of one stage
+def new_stage_stats():
+    return {'count': 0, 'errors': 0, 'sum': 0.0, 'max': 0.0, 'buckets': [0] * (len(HISTOGRAM_BUCKETS) + 1)}
+
+# Function to get the index of the histogram bucket of a duration
+def get_bucket_index(seconds):
+    for index, upper_bound in enumerate(HISTOGRAM_BUCKETS):
+        if seconds <= upper_bound:
+            return index
+    return len(HISTOGRAM_BUCKETS)
+
+# Function to add one timing to the statistics of a stage
+def add_stage_timing(stats, stage, seconds, failed=False):
+    stage_stats = stats.get(stage)
+    if stage_stats is None:
+        stage_stats = stats[stage] = new_stage_stats()
+    stage_stats['count'] += 1
+    stage_stats['errors'] += int(failed)
+    stage_stats['sum'] += seconds
+    stage_stats['max'] = max(stage_stats['max'], seconds)
+    stage_stats['buckets'][get_bucket_index(seconds)] += 1
+
+# Function to merge a batch of stage statistics into the totals
+def merge_stage_stats(totals, batch):
+    for stage, stage_stats in batch.items():
+        total = totals.get(stage)
+        if total is None:
+            total = totals[stage] = new_stage_stats()
+        total['count'] += stage_stats['count']
+        total['errors'] += stage_stats['errors']
+        total['sum'] += stage_stats['sum']
+        total['max'] = max(total['max'], stage_stats['max'])
+        total['buckets'] = [a + b for a, b in zip(total['buckets'], stage_stats['buckets'])]
+
+# Function to send the pending timings of this process to the collector without ever blocking the scraper
+def flush_stage_metrics():
+    global pending_stats, last_flush_time
+    last_flush_time = time.monotonic()
+    if metrics_queue is None or not pending_stats:
+        return
+    batch, pending_stats = pending_stats, {}
+    send_event_nowait(metrics_queue, batch)
+
+# Function to record the seconds a stage took, batching them per process
+def record_stage(stage, seconds, failed=False):
+    add_stage_timing(pending_stats, stage, seconds, failed)
+    if time.monotonic() - last_flush_time >= FLUSH_INTERVAL:
+        flush_stage_metrics()
+
+# Context manager timing a stage, a stage left by an exception is counted as an error
+@contextmanager
+def stage_span(stage):
+    start_time = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        record_stage(stage, time.perf_counter() - start_time, failed=True)
+        raise
+    record_stage(stage, time.perf_counter() - start_time)
+
+# Function to estimate a quantile from the histogram buckets, as the upper bound of the bucket holding it capped at the slowest timing
+def estimate_quantile(stage_stats, quantile):
+    if not stage_stats['count']:
+        return None
+    rank = quantile * stage_stats['count']
+    seen = 0
+    for index, count in enumerate(stage_stats['buckets']):
+        seen += count
+        if seen >= rank:
+            return min(HISTOGRAM_BUCKETS[index], round(stage_stats['max'], 4)) if index < len(HISTOGRAM_BUCKETS) else round(stage_stats['max'], 4)
+    return stage_stats['max']
+
+# Function to build the JSON snapshot of the totals, with the share of the measured time each stage took
+def build_metrics_snapshot(totals):
+    total_seconds = sum(stage_stats['sum'] for stage_stats in totals.values())
+    stages = {}
+    for stage in sorted(totals, key=lambda stage: STAGES.index(stage) if stage in STAGES else len(STAGES)):
+        stage_stats = totals[stage]
+        stages[stage] = {
+            'count': stage_stats['count'],
+            'errors': stage_stats['errors'],
+            'total_seconds': round(stage_stats['sum'], 3),
+            'mean_seconds': round(stage_stats['sum'] / stage_stats['count'], 4) if stage_stats['count'] else None,
+            'p50_seconds': estimate_quantile(stage_stats, 0.5),
+            'p95_seconds': estimate_quantile(stage_stats, 0.95),
+            'max_seconds': round(stage_stats['max'], 4),
+            'share_of_time': round(stage_stats['sum'] / total_seconds, 4) if total_seconds else None,
+        }
+    return {'time': time.strftime('%Y-%m-%d %H:%M:%S'), 'stages': stages}
+
+# Function to render the totals in the Prometheus text exposition format
+def render_prometheus_metrics(totals):
+    lines = [
+        '# HELP scraper_stage_seconds Seconds spent in each stage of the scraper',
+        '# TYPE scraper_stage_seconds histogram',
+    ]
+    for stage, stage_stats in totals.items():
+        cumulative = 0
+        for upper_bound, count in zip(HISTOGRAM_BUCKETS + ('+Inf',), stage_stats['buckets']):
+            cumulative += count
+            lines.append(f'scraper_stage_seconds_bucket{{stage="{stage}",le="{upper_bound}"}} {cumulative}')
+        lines.append(f'scraper_stage_seconds_sum{{stage="{stage}"}} {stage_stats["sum"]}')
+        lines.append(f'scraper_stage_seconds_count{{stage="{stage}"}} {stage_stats["count"]}')
+    lines += [
+        '# HELP scraper_stage_errors_total Stages left by an error',
+        '# TYPE scraper_stage_errors_total counter',
+    ]
+    for stage, stage_stats in totals.items():
+        lines.append(f'scraper_stage_errors_total{{stage="{stage}"}} {stage_stats["errors"]}')
+    return '\n'.join(lines) + '\n'
+
+# Function to write the JSON snapshot atomically so readers never see a partial file
+def write_metrics_snapshot(totals, snapshot_file):
+    os.makedirs(os.path.dirname(snapshot_file) or '.', exist_ok=True)
+    temporary_file = snapshot_file + '.tmp'
+    with open(temporary_file, 'w', encoding='utf-8') as file:
+        json.dump(build_metrics_snapshot(totals), file, indent=2)
+    os.replace(temporary_file, snapshot_file)
+
+# Request handler serving the totals to Prometheus and as JSON
+class MetricsHandler(BaseHTTPRequestHandler):
+    def send_body(self, body, content_type):
+        data = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        with self.server.lock:
+            if self.path == '/metrics':
+                body = render_prometheus_metrics(self.server.totals)
+            elif self.path == '/metrics.json':
+                body = json.dumps(build_metrics_snapshot(self.server.totals))
+            else:
+                body = None
+        if body is None:
+            self.send_error(404)
+        elif self.path == '/metrics':
+            self.send_body(body, 'text/plain; version=0.0.4; charset=utf-8')
+        else:
+            self.send_body(body, 'application/json')
+
+    def log_message(self, format, *args):
+        pass
+
+# Function to merge the batches of every worker into the totals and write a snapshot at a fixed interval until stop_event is set
+def run_metrics_collector(batches, totals, lock, stop_event, snapshot_file=METRICS_SNAPSHOT_FILE, interval=SNAPSHOT_INTERVAL):
+    next_snapshot_time = time.monotonic() + interval
+    while True:
+        try:
+            batch = batches.get(timeout=1.0)
+            with lock:
+                merge_stage_stats(totals, batch)
+            continue
+        except queue.Empty:
+            pass
+        finally:
+            if snapshot_file and time.monotonic() >= next_snapshot_time:
+                with lock:
+                    write_metrics_snapshot(totals, snapshot_file)
+                next_snapshot_time = time.monotonic() + interval
+        # Only stop once the queue is drained so the last batches of the workers are counted
+        if stop_event.is_set():
+            break
+    if snapshot_file:
+        with lock:
+            write_metrics_snapshot(totals, snapshot_file)
+
+# Function to start the collector thread and the Prometheus endpoint, port None only writes the snapshots.
+# A port already in use, e.g. by a second scraper on the machine, also falls back to the snapshots.
+def start_metrics_collector(port=None, snapshot_file=METRICS_SNAPSHOT_FILE, interval=SNAPSHOT_INTERVAL, host='127.0.0.1'):
+    batches = create_event_queue(METRICS_QUEUE_SIZE)
+    totals = {}
+    lock = threading.Lock()
+    stop_event = threading.Event()
+    thread = threading.Thread(target=run_metrics_collector, args=(batches, totals, lock, stop_event, snapshot_file, interval), daemon=True)
+    thread.start()
+
+    server = None
+    if port is not None:
+        try:
+            server = ThreadingHTTPServer((host, port), MetricsHandler)
+        except OSError as e:
+            print_and_log_time(f"Stage metrics endpoint not started on port {port}, only writing {snapshot_file}: {e}", None, logging.WARNING)
+    if server is not None:
+        server.daemon_threads = True
+        server.totals = totals
+        server.lock = lock
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # The main process records its own stages through the same queue
+    set_metrics_queue(batches)
+    return thread, stop_event, server, batches
+
+# Function to send the last timings of the main process, write the final snapshot and stop the endpoint
+def stop_metrics_collector(thread, stop_event, server):
+    flush_stage_metrics()
+    stop_event.set()
+    thread.join()
+    if server is not None:
+        server.shutdown()
+        server.server_close()
+
+# Function to print a snapshot as a table, slowest stage first
+def print_metrics_snapshot(snapshot):
+    print(f"Stage metrics at {snapshot['time']}")
+    print(f"{'stage':<20} {'count':>8} {'errors':>7} {'total s':>10} {'mean s':>8} {'p50 s':>7} {'p95 s':>7} {'share':>7}")
+    for stage, stats in sorted(snapshot['stages'].items(), key=lambda item: -item[1]['total_seconds']):
+        mean = f"{stats['mean_seconds']:.3f}" if stats['mean_seconds'] is not None else '-'
+        share = f"{stats['share_of_time']:.1%}" if stats['share_of_time'] is not None else '-'
+        print(f"{stage:<20} {stats['count']:>8} {stats['errors']:>7} {stats['total_seconds']:>10.1f} {mean:>8} {stats['p50_seconds']:>7} {stats['p95_seconds']:>7} {share:>7}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show where the scraper spends its time from a stage metrics snapshot")
+    parser.add_argument("snapshot", nargs='?', default=METRICS_SNAPSHOT_FILE, help="JSON snapshot written by the scraper")
+    args = parser.parse_args()
+
+    with open(args.snapshot, 'r', encoding='utf-8') as file:
+        print_metrics_snapshot(json.load(file))
@@ -0,0 +1,134 @@
+import os
+import sys
+import json
+import time
+import queue
+import multiprocessing
+from datetime import timedelta
+from event_queue import create_event_queue, send_event_nowait
+
+# Seconds between two redraws of the dashboard
+REFRESH_INTERVAL = 1.0
+
+# Maximum number of status events waiting for the dashboard
+STATUS_QUEUE_SIZE = 10000
+
+# Weight of the newest interval in the per-instance plots/sec average
+RATE_SMOOTHING = 0.2
+
+# Queue of the dashboard, set in every process that reports status
+status_queue = None
+
+# Function to set the dashboard queue of the current process, used as a pool initializer
+def set_status_queue(new_status_queue):
+    global status_queue
+    status_queue = new_status_queue
+
+# Function to send an event to the dashboard of the current process
+def send_status_event(event):
+    send_event_nowait(status_queue, event)
+
+# Function to report the plot an instance is working on
+def report_plot(instance_id, status):
+    send_status_event(('plot', instance_id, time.time(), status))
+
+# Function to report a message of an instance, such as a retry
+def report_message(instance_id, message):
+    send_status_event(('message', instance_id, time.time(), message))
+
+# Function to report that an instance finished a village
+def report_village_done(instance_id, village_name):
+    send_status_event(('village_done', instance_id, time.time(), village_name))
+
+# Function to report that an instance has no village in progress
+def report_instance_idle(instance_id):
+    send_status_event(('idle', instance_id, time.time(), None))
+
+# Function to report what is being scraped and how many of its villages are already done
+def report_scope(title, total_villages, completed_villages):
+    send_status_event(('scope', None, time.time(), {
+        'title': title,
+        'total_villages': total_villages,
+        'completed_villages': completed_villages
+    }))
+
+# Function to render the dashboard text
+def render_status(scope, instances, started_at, completed_since_start):
+    lines = []
+    if scope:
+        lines.append(scope['title'])
+        remaining = scope['total_villages'] - scope['completed_villages']
+        elapsed = time.time() - started_at
+        eta = "unknown"
+        if completed_since_start and remaining > 0:
+            eta = str(timedelta(seconds=int(elapsed / completed_since_start * remaining)))
+        elif remaining <= 0:
+            eta = "done"
+        lines.append(f"Completed villages: {scope['completed_villages']}/{scope['total_villages']}  ETA: {eta}\n")
+    for instance_id in sorted(instances):
+        instance = instances[instance_id]
+        rate = 1 / instance['interval'] if instance.get('interval') else 0.0
+        lines.append(f"Instance {instance_id} ({rate:.2f} plots/s): {json.dumps(instance['status'], ensure_ascii=False)}")
+    return '\n'.join(lines)
+
+# Function to run the dashboard loop until a None event arrives
+def run_status_dashboard(events, refresh_interval=REFRESH_INTERVAL):
+    # Enable ANSI escape codes on Windows consoles
+    if os.name == 'nt':
+        os.system('')
+
+    scope = None
+    instances = {}
+    started_at = time.time()
+    completed_since_start = 0
+    next_redraw = time.monotonic()
+
+    while True:
+        try:
+            event = events.get(timeout=max(0, next_redraw - time.monotonic()))
+        except queue.Empty:
+            event = ()
+
+        if event is None:
+            break
+        if event:
+            kind, instance_id, timestamp, payload = event
+            if kind == 'scope':
+                scope = payload
+                started_at = timestamp
+                completed_since_start = 0
+            elif kind == 'plot':
+                instance = instances.setdefault(instance_id, {'status': {}})
+                if instance.get('last_plot_at'):
+                    interval = timestamp - instance['last_plot_at']
+                    previous = instance.get('interval') or interval
+                    instance['interval'] = previous + RATE_SMOOTHING * (interval - previous)
+                instance['last_plot_at'] = timestamp
+                instance['status'] = payload
+            elif kind == 'message':
+                instances.setdefault(instance_id, {'status': {}})['status']['message'] = payload
+            elif kind == 'village_done':
+                completed_since_start += 1
+                if scope:
+                    scope['completed_villages'] += 1
+            elif kind == 'idle':
+                instances.pop(instance_id, None)
+
+        if time.monotonic() >= next_redraw:
+            # Move the cursor home and clear the screen instead of spawning a shell
+            sys.stdout.write('\033[H\033[J' + render_status(scope, instances, started_at, completed_since_start) + '\n')
+            sys.stdout.flush()
+            next_redraw = time.monotonic() + refresh_interval
+
+# Function to start the dashboard process and set its queue in the current process
+def start_status_dashboard(refresh_interval=REFRESH_INTERVAL):
+    events = create_event_queue(STATUS_QUEUE_SIZE)
+    process = multiprocessing.Process(target=run_status_dashboard, args=(events, refresh_interval), daemon=True)
+    process.start()
+    set_status_queue(events)
+    return process, events
+
+# Function to stop the dashboard process
+def stop_status_dashboard(process, events):
+    events.put(None)
+    process.join(timeout=5)
@@ -0,0 +1,56 @@
+import os
+import json
+from functools import lru_cache
+from indic_transliteration import sanscript
+from indic_transliteration.sanscript import transliterate
+
+# File persisting the English names of the village and taluka names seen so far
+TRANSLITERATION_CACHE_FILE = "transliteration_cache.json"
+
+# Names loaded from the cache file and names added since then
+persistent_names = None
+new_names = {}
+
+# Function to load the persistent name cache once per process
+def load_transliteration_cache(cache_file=TRANSLITERATION_CACHE_FILE):
+    global persistent_names
+    if persistent_names is None:
+        persistent_names = {}
+        if os.path.exists(cache_file):
+            with open(cache_file, 'r', encoding='utf-8') as file:
+                persistent_names = json.load(file)
+    return persistent_names
+
+# Function to transliterate a Devanagari name into the normalized English name used in the outputs
+@lru_cache(maxsize=8192)
+def transliterate_name(name_marathi):
+    names = load_transliteration_cache()
+    if name_marathi not in names:
+        names[name_marathi] = transliterate(name_marathi, sanscript.DEVANAGARI, sanscript.ITRANS).title().replace("-", "")
+        new_names[name_marathi] = names[name_marathi]
+    return names[name_marathi]
+
+# Function to add names transliterated in other processes to this process's cache
+def remember_transliterations(names):
+    cached_names = load_transliteration_cache()
+    for name_marathi, name_english in names.items():
+        if name_marathi not in cached_names:
+            cached_names[name_marathi] = name_english
+            new_names[name_marathi] = name_english
+
+# Function to write the names added in this process to the cache file
+def save_transliteration_cache(cache_file=TRANSLITERATION_CACHE_FILE):
+    if not new_names:
+        return
+
+    # Merge with the file as it is now, other processes may have saved names meanwhile
+    names = {}
+    if os.path.exists(cache_file):
+        with open(cache_file, 'r', encoding='utf-8') as file:
+            names = json.load(file)
+    names.update(new_names)
+    temp_file = f"{cache_file}.{os.getpid()}.tmp"
+    with open(temp_file, 'w', encoding='utf-8') as file:
+        json.dump(names, file, ensure_ascii=False, indent=0, sort_keys=True)
+    os.replace(temp_file, cache_file)
+    new_names.clear()